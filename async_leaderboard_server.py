@@ -0,0 +1,226 @@
+"""asyncio entry point for the leaderboard API, built on aiohttp.
+
+Serves the same /api/* contract as leaderboard_server.py from the same
+database and handlers. Idle keep-alive connections are just sockets on the
+event loop instead of threads. Database access runs in a thread pool and
+password hashing in the shared process pool, whose results are awaited on
+the loop so a login burst can't tie up the database threads. JWTs are
+issued and checked with the Flask app's settings, so tokens work against
+either server.
+
+    python async_leaderboard_server.py --port 5000
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+from aiohttp import web
+from flask_jwt_extended import decode_token
+from jwt import ExpiredSignatureError, InvalidTokenError
+
+from log_setup import setup_logging
+import leaderboard_server as server
+
+logger = logging.getLogger(__name__)
+
+executor = ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) + 4), thread_name_prefix="db")
+
+def in_app_context(handler, *args):
+    def call():
+        with server.app.app_context():
+            return handler(*args)
+    return asyncio.get_running_loop().run_in_executor(executor, call)
+
+def json_response(payload, status):
+    return web.json_response(payload, status=status)
+
+async def read_json(request):
+    try:
+        return await request.json()
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None
+
+def int_param(request, name, default):
+    try:
+        return int(request.query.get(name, default))
+    except ValueError:
+        return default
+
+async def authenticated_user(request):
+    """Return the JWT identity for the request, or raise an error response."""
+    header = request.headers.get("Authorization", "")
+    if not header:
+        raise web.HTTPUnauthorized(text=json.dumps({"msg": "Missing Authorization Header"}),
+                                   content_type="application/json")
+    scheme, _, token = header.partition(" ")
+    if scheme != "Bearer" or not token:
+        raise web.HTTPUnprocessableEntity(text=json.dumps({"msg": "Bad Authorization header. Expected 'Authorization: Bearer <JWT>'"}),
+                                          content_type="application/json")
+    try:
+        decoded = await in_app_context(decode_token, token)
+    except ExpiredSignatureError:
+        raise web.HTTPUnauthorized(text=json.dumps({"msg": "Token has expired"}), content_type="application/json")
+    except InvalidTokenError as e:
+        raise web.HTTPUnprocessableEntity(text=json.dumps({"msg": str(e)}), content_type="application/json")
+    return decoded[server.app.config["JWT_IDENTITY_CLAIM"]]
+
+def sheds_load(handler):
+    """Answer 503 with Retry-After when the password hashing queue is full."""
+    async def wrapped(request):
+        try:
+            return await handler(request)
+        except server.HasherBusy as e:
+            logger.warning("Password hashing queue full, rejecting request")
+            return web.json_response({"error": "Server busy, try again shortly"}, status=503,
+                                     headers={"Retry-After": str(e.retry_after)})
+    return wrapped
+
+@sheds_load
+async def register(request):
+    data = await read_json(request)
+    error = server.credentials_error(data) or await in_app_context(server.username_taken, data['username'])
+    if error:
+        return json_response(*error)
+    # Awaited here rather than in the executor, so hashing never holds a database thread
+    password_hash = await asyncio.wrap_future(server.password_hasher.hash(data['password']))
+    return json_response(*await in_app_context(server.add_user, data['username'], password_hash))
+
+@sheds_load
+async def login(request):
+    data = await read_json(request)
+    error = server.credentials_error(data)
+    if error:
+        return json_response(*error)
+    user_id, password_hash = await in_app_context(server.stored_password, data['username'])
+    password_valid = user_id is not None and await asyncio.wrap_future(
+        server.password_hasher.check(password_hash, data['password']))
+    return json_response(*await in_app_context(server.login_response, data['username'], user_id, password_valid))
+
+async def get_leaderboard(request):
+    body, status, etag = await in_app_context(
+        server.leaderboard_body,
+        request.query.get("window", server.ALL_TIME),
+        int_param(request, "offset", 0),
+        int_param(request, "limit", 10),
+        request.query.get("after")
+    )
+    if etag is None:
+        return web.Response(body=body, status=status, content_type="application/json")
+    quoted = f'"{etag}"'
+    if_none_match = request.headers.get("If-None-Match", "")
+    if quoted in (tag.strip() for tag in if_none_match.split(",")) or if_none_match.strip() == "*":
+        return web.Response(status=304, headers={"ETag": quoted})
+    return web.Response(body=body, status=status, content_type="application/json", headers={"ETag": quoted})
+
+async def get_rank(request):
+    return json_response(*await in_app_context(
+        server.rank_for_user,
+        request.match_info["username"],
+        request.query.get("window", server.ALL_TIME),
+        int_param(request, "radius", server.app.config["RANK_NEIGHBOUR_RADIUS"])
+    ))
+
+async def get_percentile(request):
+    try:
+        score = int(request.query["score"])
+    except (KeyError, ValueError):
+        score = None
+    return json_response(*await in_app_context(server.percentile_for, score))
+
+async def get_histogram(request):
+    return json_response(*await in_app_context(server.histogram_summary))
+
+async def submit_score(request):
+    user_id = await authenticated_user(request)
+    return json_response(*await in_app_context(server.submit_score_for, user_id, await read_json(request)))
+
+async def submit_scores(request):
+    user_id = await authenticated_user(request)
+    return json_response(*await in_app_context(server.submit_scores_for, user_id, await read_json(request)))
+
+async def get_metrics(request):
+    return web.Response(body=server.metrics.render().encode(),
+                        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+@web.middleware
+async def metrics_middleware(request, handler):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await handler(request)
+        status = response.status
+        return response
+    except web.HTTPException as e:
+        status = e.status
+        raise
+    finally:
+        resource_info = request.match_info.route.resource
+        route = resource_info.canonical if resource_info else "unmatched"
+        labels = (("route", route), ("method", request.method))
+        server.metrics.observe("leaderboard_request_duration_seconds", labels, time.perf_counter() - start)
+        server.metrics.inc("leaderboard_requests_total", labels + (("status", status),))
+
+@web.middleware
+async def cors_middleware(request, handler):
+    if request.method == "OPTIONS":
+        response = web.Response()
+        response.headers["Access-Control-Allow-Methods"] = "GET, POST, OPTIONS"
+        response.headers["Access-Control-Allow-Headers"] = request.headers.get(
+            "Access-Control-Request-Headers", "Authorization, Content-Type")
+    else:
+        try:
+            response = await handler(request)
+        except web.HTTPException as e:
+            e.headers["Access-Control-Allow-Origin"] = "*"
+            raise
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    return response
+
+def create_app():
+    app = web.Application(middlewares=[cors_middleware, metrics_middleware])
+    app.add_routes([
+        web.post("/api/register", register),
+        web.post("/api/login", login),
+        web.get("/api/leaderboard", get_leaderboard),
+        web.get("/api/rank/{username:.+}", get_rank),
+        web.get("/api/percentile", get_percentile),
+        web.get("/api/histogram", get_histogram),
+        web.post("/api/submit_score", submit_score),
+        web.post("/api/submit_scores", submit_scores),
+        web.get("/api/metrics", get_metrics),
+    ])
+    return app
+
+def raise_open_file_limit():
+    # Every idle keep-alive client holds a socket
+    if resource is None:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the leaderboard API on aiohttp.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--keepalive-timeout", type=float, default=75.0,
+                        help="seconds an idle keep-alive connection is held open")
+    args = parser.parse_args()
+
+    setup_logging({"leaderboard_server": "DEBUG"})
+    raise_open_file_limit()
+    server.init_db()
+    web.run_app(create_app(), host=args.host, port=args.port, keepalive_timeout=args.keepalive_timeout,
+                access_log=None)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import pygame
+from game_settings import *
+
+class DirtyRenderer:
+    """Presents only the parts of the screen that changed during play.
+
+    The background and ring are drawn once to their own surface. Each
+    frame, restore() copies the background back over whatever was drawn
+    the frame before, the caller draws the moving objects and passes their
+    rects to present(), and only the old and new rects are sent to the
+    display. When they cover more than full_update_ratio of the screen a
+    plain flip is cheaper, so present() falls back to that.
+    """
+
+    def __init__(self, screen, full_update_ratio=0.5):
+        self.screen = screen
+        self.full_update_area = screen.get_width() * screen.get_height() * full_update_ratio
+        self.background = self.build_background()
+        self.previous_rects = []
+        self.full = True
+
+    def build_background(self):
+        background = pygame.Surface(self.screen.get_size()).convert()
+        background.fill(BACKGROUND_COLOR)
+        pygame.draw.circle(background, WHITE, (GAME_WIDTH // 2, GAME_HEIGHT // 2), RING_RADIUS, RING_THICKNESS)
+        return background
+
+    def invalidate(self):
+        """Redraw and flip the whole screen on the next frame."""
+        self.full = True
+
+    def draw_background(self):
+        self.screen.blit(self.background, (0, 0))
+
+    def restore(self):
+        if self.full:
+            self.draw_background()
+        else:
+            for rect in self.previous_rects:
+                self.screen.blit(self.background, rect, rect)
+
+    def present(self, rects=None):
+        """Show this frame. rects=None means the whole screen was redrawn."""
+        if rects is None:
+            pygame.display.flip()
+            self.full = True  # Whatever was drawn isn't tracked, so the next dirty frame starts over
+            return
+        dirty = self.previous_rects + rects
+        if self.full or sum(rect.width * rect.height for rect in dirty) > self.full_update_area:
+            pygame.display.flip()
+        else:
+            pygame.display.update(dirty)
+        self.previous_rects = rects
+        self.full = False
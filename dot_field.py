@@ -0,0 +1,104 @@
+import math
+import numpy as np
+import pygame
+from game_settings import *
+
+BAD_DOT, GOOD_DOT = 0, 1
+DOT_COLORS = (RED, GREEN)  # Indexed by kind
+
+class DotField:
+    """Objects spiralling out from the centre, kept as parallel NumPy arrays.
+
+    Each tick moves, culls and collision-tests every object in a few array
+    operations, so the cost hardly grows with the number of objects. kind
+    is a small integer the owner gives meaning to, e.g. good or bad dot.
+    Removal keeps the remaining objects in spawn order.
+    """
+
+    def __init__(self, capacity=64):
+        self.count = 0
+        self.angle = np.empty(capacity)
+        self.distance = np.empty(capacity)
+        # Rows are x and y, so both coordinates update in one operation
+        self.position = np.empty((2, capacity))
+        self.previous = np.empty((2, capacity))
+        self.kind = np.empty(capacity, dtype=np.int8)
+        self.center = np.array([[GAME_WIDTH // 2], [GAME_HEIGHT // 2]], dtype=float)
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def x(self):
+        return self.position[0]
+
+    @property
+    def y(self):
+        return self.position[1]
+
+    def grow(self):
+        capacity = len(self.kind) * 2
+        for name in ("angle", "distance", "kind"):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+        for name in ("position", "previous"):
+            old = getattr(self, name)
+            new = np.empty((2, capacity))
+            new[:, :self.count] = old[:, :self.count]
+            setattr(self, name, new)
+
+    def spawn(self, angle, kind, distance=50):
+        if self.count == len(self.kind):
+            self.grow()
+        i = self.count
+        self.angle[i], self.distance[i], self.kind[i] = angle, distance, kind
+        self.position[0, i] = self.previous[0, i] = GAME_WIDTH // 2 + math.cos(angle) * distance
+        self.position[1, i] = self.previous[1, i] = GAME_HEIGHT // 2 + math.sin(angle) * distance
+        self.count += 1
+
+    def move(self, difficulty_multiplier):
+        n = self.count
+        if not n:
+            return
+        speed = PLAYER_SPEED * difficulty_multiplier
+        position = self.position[:, :n]
+        self.previous[:, :n] = position
+        angle = self.angle[:n]
+        angle += 0.02 * difficulty_multiplier
+        distance = self.distance[:n]
+        distance += speed * 1.2
+        np.cos(angle, out=position[0])
+        np.sin(angle, out=position[1])
+        position *= distance
+        position += self.center
+
+    def beyond(self, distance):
+        """Mask of the objects further than distance from the centre."""
+        return self.distance[:self.count] > distance
+
+    def touching(self, x, y, radius):
+        """Mask of the objects closer than radius to (x, y)."""
+        n = self.count
+        return np.hypot(self.position[0, :n] - x, self.position[1, :n] - y) < radius
+
+    def remove(self, mask):
+        if not mask.any():
+            return
+        keep = ~mask
+        remaining = int(np.count_nonzero(keep))
+        n = self.count
+        for array in (self.angle, self.distance, self.kind):
+            array[:remaining] = array[:n][keep]
+        for array in (self.position, self.previous):
+            array[:, :remaining] = array[:, :n][:, keep]
+        self.count = remaining
+
+    def draw(self, screen, colors, alpha=1.0):
+        """Draw each object in colors[kind], alpha of the way from its previous tick position."""
+        n = self.count
+        previous = self.previous[:, :n]
+        points = (previous + (self.position[:, :n] - previous) * alpha).astype(int).tolist()
+        return [pygame.draw.circle(screen, colors[kind], (x, y), DOT_RADIUS)
+                for x, y, kind in zip(points[0], points[1], self.kind[:n].tolist())]
@@ -1,17 +1,44 @@
 import pygame
+from collections import OrderedDict
 
 class FontManager:
-    def __init__(self, font_file):
+    def __init__(self, font_file, max_text_surfaces=256):
         self.font_file = font_file
         self.fonts = {}
         self.scale_factor = 1
+        # Rendered text, least recently used first
+        self.text_surfaces = OrderedDict()
+        self.max_text_surfaces = max_text_surfaces
+        self.hits = 0
+        self.misses = 0
 
     def update_scale_factor(self, scale_factor):
+        if scale_factor == self.scale_factor:
+            return
         self.scale_factor = scale_factor
         self.fonts.clear()  # Clear cached fonts when scale changes
+        self.text_surfaces.clear()
 
     def get_font(self, base_size):
         scaled_size = int(base_size * self.scale_factor)
         if scaled_size not in self.fonts:
             self.fonts[scaled_size] = pygame.font.Font(self.font_file, scaled_size)
-        return self.fonts[scaled_size]
\ No newline at end of file
+        return self.fonts[scaled_size]
+
+    def render_text(self, text, base_size, color, antialias=True):
+        """Like Font.render, but reuses the surface for text rendered before.
+
+        The surface is shared between callers, so blit it but don't draw on it.
+        """
+        key = (text, int(base_size * self.scale_factor), tuple(color), antialias)
+        surface = self.text_surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.text_surfaces.move_to_end(key)
+            return surface
+        self.misses += 1
+        surface = self.get_font(base_size).render(text, antialias, color)
+        self.text_surfaces[key] = surface
+        if len(self.text_surfaces) > self.max_text_surfaces:
+            self.text_surfaces.popitem(last=False)
+        return surface
@@ -0,0 +1,122 @@
+"""Per-frame timings for the game loop.
+
+Phases (events, callbacks, update, render, flip) and subsystems (dots,
+power-ups, particles, achievements, text) are timed with perf_counter_ns.
+Subsystem columns add up their update and draw time, so they overlap the
+update and render phases. Rolling p50/p95/p99 are shown in an overlay
+toggled with F3, and every frame can be written to a CSV file.
+
+    TWISTER_PROFILE=1                  # profile from the start, F3 shows it
+    TWISTER_PROFILE_CSV=frames.csv     # also write one row per frame
+
+When profiling is off, start() and stop() return straight away, so the
+instrumented code costs one method call per section.
+"""
+import csv
+import logging
+import os
+import time
+from collections import deque
+import pygame
+from game_settings import WHITE
+
+logger = logging.getLogger(__name__)
+
+PHASES = ("events", "callbacks", "update", "render", "flip")
+SUBSYSTEMS = ("dots", "power_ups", "particles", "achievements", "text")
+COLUMNS = ("frame",) + PHASES + SUBSYSTEMS
+PERCENTILES = (50, 95, 99)
+OVERLAY_REFRESH_NS = 500_000_000
+
+class FrameProfiler:
+    def __init__(self, enabled=False, csv_path=None, window=600):
+        self.always_on = enabled or csv_path is not None
+        self.enabled = self.always_on
+        self.overlay = False
+        self.samples = {column: deque(maxlen=window) for column in COLUMNS}
+        self.current = dict.fromkeys(COLUMNS, 0)
+        self.frame = 0
+        self.frame_started = 0
+        self.overlay_surface = None
+        self.overlay_updated = 0
+        self.csv_file = None
+        self.csv_writer = None
+        if csv_path:
+            self.csv_file = open(csv_path, "w", newline="", encoding="utf-8")
+            self.csv_writer = csv.writer(self.csv_file)
+            self.csv_writer.writerow(["frame", "ticks"] + [f"{column}_ns" for column in COLUMNS])
+            logger.info("Writing frame timings to %s", csv_path)
+
+    def start(self):
+        return time.perf_counter_ns() if self.enabled else 0
+
+    def stop(self, name, started):
+        if self.enabled and started:  # Not a section that began before F3 turned profiling on
+            self.current[name] += time.perf_counter_ns() - started
+
+    def begin_frame(self):
+        if self.enabled:
+            self.frame_started = time.perf_counter_ns()
+
+    def end_frame(self, ticks):
+        if not self.enabled:
+            return
+        self.current["frame"] = time.perf_counter_ns() - self.frame_started
+        for column, value in self.current.items():
+            self.samples[column].append(value)
+        if self.csv_writer:
+            self.csv_writer.writerow([self.frame, ticks] + [self.current[column] for column in COLUMNS])
+        self.current = dict.fromkeys(COLUMNS, 0)
+        self.frame += 1
+
+    def percentiles(self, column):
+        values = sorted(self.samples[column])
+        if not values:
+            return [0] * len(PERCENTILES)
+        return [values[min(len(values) - 1, len(values) * point // 100)] for point in PERCENTILES]
+
+    def toggle_overlay(self):
+        self.overlay = not self.overlay
+        self.enabled = self.overlay or self.always_on
+        self.frame_started = time.perf_counter_ns()
+        self.overlay_surface = None
+
+    def draw(self, screen, font):
+        if not self.overlay:
+            return None
+        now = time.perf_counter_ns()
+        # Rendering the text every frame would show up in the numbers it reports
+        if self.overlay_surface is None or now - self.overlay_updated > OVERLAY_REFRESH_NS:
+            self.overlay_surface = self.render_overlay(font)
+            self.overlay_updated = now
+        return screen.blit(self.overlay_surface, (screen.get_width() - self.overlay_surface.get_width() - 5, 5))
+
+    def render_overlay(self, font):
+        rows = [["ms"] + [f"p{point}" for point in PERCENTILES]]
+        for column in COLUMNS:
+            rows.append([column] + [f"{value / 1e6:.2f}" for value in self.percentiles(column)])
+        name_width = max(font.size(row[0])[0] for row in rows) + 10
+        value_width = font.size("000.00")[0] + 10
+        line_height = font.get_linesize()
+        surface = pygame.Surface((name_width + value_width * len(PERCENTILES) + 10, line_height * len(rows) + 10),
+                                 pygame.SRCALPHA)
+        surface.fill((0, 0, 0, 160))
+        for i, row in enumerate(rows):
+            y = 5 + i * line_height
+            surface.blit(font.render(row[0], True, WHITE), (5, y))
+            for j, cell in enumerate(row[1:], 1):
+                text = font.render(cell, True, WHITE)
+                # Right-aligned so the decimal points line up
+                surface.blit(text, (5 + name_width + value_width * j - text.get_width(), y))
+        return surface
+
+    def close(self):
+        if self.csv_file:
+            self.csv_file.close()
+            self.csv_file = None
+            self.csv_writer = None
+
+def create_profiler():
+    """Profiler configured from TWISTER_PROFILE and TWISTER_PROFILE_CSV."""
+    return FrameProfiler(enabled=os.environ.get("TWISTER_PROFILE", "") not in ("", "0"),
+                         csv_path=os.environ.get("TWISTER_PROFILE_CSV") or None)
@@ -1,15 +1,18 @@
 import pygame
 from game_settings import *
+from retained_menu import RetainedMenu
 
-class GameMenu:
+class GameMenu(RetainedMenu):
     def __init__(self, screen, sound_manager, font_manager):
-        self.screen = screen
+        super().__init__(screen)
         self.sound_manager = sound_manager
         self.font_manager = font_manager
         self.menu_items = ["Start Game", "Settings", "Leaderboard", "Login", "Quit"]
         self.selected_item = -1
         self.hovered_item = -1
         self.item_rects = []
+        self.is_logged_in = False
+        self.username = ""
 
     def handle_input(self, event):
         if event.type == pygame.KEYDOWN:
@@ -40,32 +43,37 @@ class GameMenu:
         pass  # Add any necessary updates here
 
     def draw(self, is_logged_in, username):
-        self.screen.fill(BLACK)
-        font = self.font_manager.get_font(BASE_FONT_SIZE * 2)
-        title = font.render("Twister Game", True, WHITE)
+        self.is_logged_in = is_logged_in
+        self.username = username
+        super().draw()
+
+    def view_state(self):
+        return self.is_logged_in, self.username, self.selected_item, self.hovered_item
+
+    def compose(self, surface):
+        surface.fill(BLACK)
+        title = self.font_manager.render_text("Twister Game", BASE_FONT_SIZE * 2, WHITE)
         title_rect = title.get_rect(center=(GAME_WIDTH // 2, GAME_HEIGHT // 4))
-        self.screen.blit(title, title_rect)
+        surface.blit(title, title_rect)
 
-        if is_logged_in:
-            welcome_font = self.font_manager.get_font(BASE_FONT_SIZE)
-            welcome_text = welcome_font.render(f"Welcome, {username}!", True, WHITE)
+        if self.is_logged_in:
+            welcome_text = self.font_manager.render_text(f"Welcome, {self.username}!", BASE_FONT_SIZE, WHITE)
             welcome_rect = welcome_text.get_rect(center=(GAME_WIDTH // 2, GAME_HEIGHT // 4 + 50))
-            self.screen.blit(welcome_text, welcome_rect)
+            surface.blit(welcome_text, welcome_rect)
             self.menu_items[3] = "Logout"  # Change "Login" to "Logout"
         else:
             self.menu_items[3] = "Login"  # Ensure it says "Login" if not logged in
 
-        font = self.font_manager.get_font(BASE_FONT_SIZE)
         self.item_rects = []
         for i, item in enumerate(self.menu_items):
             color = ORANGE if i == self.selected_item or i == self.hovered_item else WHITE
-            text = font.render(item, True, color)
+            text = self.font_manager.render_text(item, BASE_FONT_SIZE, color)
             text_rect = text.get_rect(center=(GAME_WIDTH // 2, GAME_HEIGHT // 2 + i * 50))
-            self.screen.blit(text, text_rect)
+            surface.blit(text, text_rect)
             self.item_rects.append(text_rect)
 
         # Draw a rectangle around the selected or hovered item
         if self.hovered_item != -1:
-            pygame.draw.rect(self.screen, ORANGE, self.item_rects[self.hovered_item], 2)
+            pygame.draw.rect(surface, ORANGE, self.item_rects[self.hovered_item], 2)
         elif self.selected_item != -1:
-            pygame.draw.rect(self.screen, ORANGE, self.item_rects[self.selected_item], 2)
\ No newline at end of file
+            pygame.draw.rect(surface, ORANGE, self.item_rects[self.selected_item], 2)
\ No newline at end of file
@@ -5,7 +5,9 @@ GAME_ASPECT_RATIO = GAME_WIDTH / GAME_HEIGHT
 FONT_FILE = 'Roboto-Black.ttf'  # Replace with the path to your chosen font file
 BASE_FONT_SIZE = 20  # This is the font size for the game's native resolution
 
-FPS = 60
+FPS = 60  # Render rate cap
+TICK_RATE = 60  # Simulation steps per second, independent of FPS
+MAX_FRAME_TIME = 0.25  # Longest frame the simulation catches up on
 BACKGROUND_COLOR = (30, 30, 30) # Dark Background Color
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
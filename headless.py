@@ -0,0 +1,74 @@
+"""Play TwisterGame without a display, audio or frame clock.
+
+Each game runs its fixed simulation ticks back to back, so one core plays
+thousands of games a minute for balance tuning and regression checks. A
+game is fully determined by its seed and its input script, the ticks at
+which the player flips direction as if pressing space.
+
+    python headless.py --games 1000 --seed 1 --toggle-rate 0.02
+    python headless.py --seed 7 --script toggles.txt
+"""
+import argparse
+import random
+import statistics
+import time
+from game_settings import TICK_RATE
+from main import TwisterGame, GameState
+
+MAX_TICKS = TICK_RATE * 60 * 10
+
+def simulate(seed, toggles=(), max_ticks=MAX_TICKS):
+    """Play one game and return its result. toggles must be in increasing order."""
+    game = TwisterGame(headless=True)
+    game.start_game(seed, toggles)
+    while game.state == GameState.PLAYING and game.ticks < max_ticks:
+        game.update_game()
+    return {
+        'seed': seed,
+        'score': game.score,
+        'ticks': game.ticks,
+        'game_over': game.game_over,
+        'difficulty': game.difficulty_multiplier,
+        'achievements': [achievement.name for achievement in game.achievement_manager.achievements
+                         if achievement.unlocked],
+    }
+
+def random_toggles(seed, rate, max_ticks=MAX_TICKS):
+    """An input script that flips direction on each tick with probability rate."""
+    rng = random.Random(seed)
+    return (tick for tick in range(max_ticks) if rng.random() < rate)
+
+def read_script(path):
+    with open(path, encoding="utf-8") as f:
+        return sorted(int(line) for line in f if line.strip())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=1, help="number of games, seeded seed, seed + 1, ...")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game")
+    parser.add_argument("--script", help="file with one toggle tick per line, used for every game")
+    parser.add_argument("--toggle-rate", type=float, default=0.02,
+                        help="per-tick chance of a random toggle when no script is given")
+    parser.add_argument("--max-ticks", type=int, default=MAX_TICKS, help="stop a game after this many ticks")
+    args = parser.parse_args()
+
+    script = read_script(args.script) if args.script else None
+    results = []
+    started = time.perf_counter()
+    for seed in range(args.seed, args.seed + args.games):
+        toggles = script if script is not None else random_toggles(seed, args.toggle_rate, args.max_ticks)
+        results.append(simulate(seed, toggles, args.max_ticks))
+    elapsed = time.perf_counter() - started
+
+    if args.games == 1:
+        print(results[0])
+        return
+    scores = [result['score'] for result in results]
+    ticks = [result['ticks'] for result in results]
+    print(f"{args.games} games in {elapsed:.1f}s ({args.games / elapsed * 60:.0f} games/min)")
+    print(f"score: mean {statistics.mean(scores):.1f}, median {statistics.median(scores)}, max {max(scores)}")
+    print(f"length: mean {statistics.mean(ticks) / TICK_RATE:.1f}s, "
+          f"{sum(not result['game_over'] for result in results)} reached --max-ticks")
+
+if __name__ == "__main__":
+    main()
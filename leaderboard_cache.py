@@ -0,0 +1,36 @@
+import hashlib
+import json
+import threading
+
+class LeaderboardCache:
+    def __init__(self, size=10):
+        self.size = size
+        self.lock = threading.Lock()
+        self.body = None
+        self.etag = None
+        self.cutoff = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, build):
+        # Rebuilding under the lock means a burst of misses runs the query once
+        with self.lock:
+            if self.body is None:
+                self.misses += 1
+                entries = build()
+                self.body = json.dumps(entries).encode()
+                self.etag = hashlib.sha1(self.body).hexdigest()
+                # A board with free slots can be changed by any score
+                self.cutoff = entries[-1]['score'] if len(entries) >= self.size else None
+            else:
+                self.hits += 1
+            return self.body, self.etag
+
+    def score_submitted(self, score):
+        with self.lock:
+            if self.body is not None and (self.cutoff is None or score >= self.cutoff):
+                self.body = None
+
+    def invalidate(self):
+        with self.lock:
+            self.body = None
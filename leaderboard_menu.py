@@ -1,27 +1,62 @@
 import pygame
 from game_settings import *
+from retained_menu import RetainedMenu
 
-class LeaderboardMenu:
-    def __init__(self, screen, font_manager, server_comm):
-        self.screen = screen
+class LeaderboardMenu(RetainedMenu):
+    def __init__(self, screen, font_manager, server_comm, task_scheduler, store):
+        super().__init__(screen)
         self.font_manager = font_manager
         self.server_comm = server_comm
+        self.task_scheduler = task_scheduler
+        self.store = store
         self.leaderboard_data = []
         self.loading = True
         self.error = None
+        self.player_rank = None
+        self.windows = [("alltime", "All Time"), ("daily", "Today"), ("weekly", "This Week")]
+        self.window_index = 0
         self.main_menu_button_rect = None
         self.is_main_menu_button_selected = False
 
-    async def fetch_leaderboard(self):
-        self.loading = True
+    def current_window(self):
+        return self.windows[self.window_index][0]
+
+    def fetch_leaderboard(self):
+        """Show the cached leaderboard at once and revalidate it if stale."""
+        window = self.current_window()
+        data, fresh = self.store.cached_leaderboard(window)
         self.error = None
-        try:
-            self.leaderboard_data = await self.server_comm.get_leaderboard()
-            self.loading = False
-        except Exception as e:
-            self.error = str(e)
+        self.loading = data is None
+        if data is not None:
+            self.leaderboard_data = data
+        if not fresh:
+            self.task_scheduler.submit(self.store.fetch_leaderboard(window),
+                                       self.leaderboard_loaded, self.leaderboard_failed, key="leaderboard")
+
+    def leaderboard_loaded(self, data):
+        self.leaderboard_data = data
+        self.loading = False
+
+    def leaderboard_failed(self, error):
+        # Keep showing cached entries if there are any
+        if self.loading:
+            self.error = str(error)
             self.loading = False
 
+    def fetch_rank(self, username):
+        window = self.current_window()
+        rank, fresh = self.store.cached_rank(username, window)
+        self.player_rank = rank
+        if not fresh:
+            self.task_scheduler.submit(self.store.fetch_rank(username, window),
+                                       self.rank_loaded, self.rank_failed, key="rank")
+
+    def rank_loaded(self, rank):
+        self.player_rank = rank
+
+    def rank_failed(self, error):
+        pass  # Keep the cached rank, if any
+
     def handle_input(self, event):
         if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:  # Left mouse button
             if self.main_menu_button_rect and self.main_menu_button_rect.collidepoint(event.pos):
@@ -34,33 +69,51 @@ class LeaderboardMenu:
         elif event.type == pygame.KEYDOWN:
             if event.key == pygame.K_RETURN:
                 return "mainmenu"
+            elif event.key == pygame.K_TAB:
+                self.window_index = (self.window_index + 1) % len(self.windows)
+                return "refresh"
         return None
 
-    def draw(self):
-        self.screen.fill(BLACK)
-        title_font = self.font_manager.get_font(BASE_FONT_SIZE * 2)
-        regular_font = self.font_manager.get_font(BASE_FONT_SIZE)
+    def view_state(self):
+        # leaderboard_data is replaced rather than changed in place, so comparing it is cheap
+        return (self.window_index, self.loading, self.error, self.leaderboard_data, self.player_rank,
+                self.is_main_menu_button_selected)
 
-        title = title_font.render("Leaderboard", True, WHITE)
+    def compose(self, surface):
+        surface.fill(BLACK)
+
+        title = self.font_manager.render_text("Leaderboard", BASE_FONT_SIZE * 2, WHITE)
         title_rect = title.get_rect(center=(GAME_WIDTH // 2, 50))
-        self.screen.blit(title, title_rect)
+        surface.blit(title, title_rect)
+
+        window_text = self.font_manager.render_text(f"{self.windows[self.window_index][1]} (TAB to switch)",
+                                                    BASE_FONT_SIZE, GREY)
+        window_rect = window_text.get_rect(center=(GAME_WIDTH // 2, 85))
+        surface.blit(window_text, window_rect)
 
         if self.loading:
-            loading_text = regular_font.render("Loading...", True, WHITE)
+            loading_text = self.font_manager.render_text("Loading...", BASE_FONT_SIZE, WHITE)
             loading_rect = loading_text.get_rect(center=(GAME_WIDTH // 2, GAME_HEIGHT // 2))
-            self.screen.blit(loading_text, loading_rect)
+            surface.blit(loading_text, loading_rect)
         elif self.error:
-            error_text = regular_font.render(f"Error: {self.error}", True, RED)
+            error_text = self.font_manager.render_text(f"Error: {self.error}", BASE_FONT_SIZE, RED)
             error_rect = error_text.get_rect(center=(GAME_WIDTH // 2, GAME_HEIGHT // 2))
-            self.screen.blit(error_text, error_rect)
+            surface.blit(error_text, error_rect)
         else:
             for i, entry in enumerate(self.leaderboard_data[:10]):  # Display top 10
-                text = regular_font.render(f"{i+1}. {entry['name']}: {entry['score']}", True, WHITE)
+                text = self.font_manager.render_text(f"{i+1}. {entry['name']}: {entry['score']}", BASE_FONT_SIZE, WHITE)
                 text_rect = text.get_rect(left=100, top=100 + i * 40)
-                self.screen.blit(text, text_rect)
+                surface.blit(text, text_rect)
+
+            if self.player_rank:
+                rank_text = self.font_manager.render_text(f"You are #{self.player_rank['rank']:,}",
+                                                          BASE_FONT_SIZE, ORANGE)
+                rank_rect = rank_text.get_rect(center=(GAME_WIDTH // 2, 100 + 10 * 40 + 30))
+                surface.blit(rank_text, rank_rect)
 
         # Draw Main Menu button
-        main_menu_text = regular_font.render("Main Menu", True, ORANGE if self.is_main_menu_button_selected else WHITE)
+        button_color = ORANGE if self.is_main_menu_button_selected else WHITE
+        main_menu_text = self.font_manager.render_text("Main Menu", BASE_FONT_SIZE, button_color)
         self.main_menu_button_rect = main_menu_text.get_rect(center=(GAME_WIDTH // 2, GAME_HEIGHT - 50))
-        pygame.draw.rect(self.screen, ORANGE if self.is_main_menu_button_selected else WHITE, self.main_menu_button_rect, 2)
-        self.screen.blit(main_menu_text, self.main_menu_button_rect)
\ No newline at end of file
+        pygame.draw.rect(surface, button_color, self.main_menu_button_rect, 2)
+        surface.blit(main_menu_text, self.main_menu_button_rect)
\ No newline at end of file
@@ -1,28 +1,65 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g, has_request_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager, jwt_required, create_access_token, get_jwt_identity
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask_cors import CORS
+from leaderboard_cache import LeaderboardCache
+from score_writer import ScoreWriter
+from rank_index import RankIndex
+from score_histogram import ScoreHistogram
+from password_hasher import PasswordHasher, HasherBusy
+from online_migrate import AddColumn, Backfill, BuildIndexes, run_migrations
+from server_metrics import Metrics, COUNT_BUCKETS
+from log_setup import setup_logging
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
 import os
+import json
+import time
 import logging
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone
 
 app = Flask(__name__)
 CORS(app)
 
 # Configure SQLite database
 basedir = os.path.abspath(os.path.dirname(__file__))
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(basedir, 'leaderboard.db')
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get(
+    'LEADERBOARD_DATABASE_URI', 'sqlite:///' + os.path.join(basedir, 'leaderboard.db'))
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['JWT_SECRET_KEY'] = 'your-secret-key'  # Change this to a secure random key
 app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(days=1)
+app.config['SCORE_BATCH_LIMIT'] = 1000  # Max scores accepted by one /api/submit_scores call
+app.config['SCORE_WRITER_MAX_BATCH'] = 500
+app.config['SCORE_WRITER_MAX_DELAY'] = 0.002  # Seconds the writer waits to fill a group commit
+app.config['SCORE_WRITER_TIMEOUT'] = 10
+app.config['LEADERBOARD_PAGE_LIMIT'] = 100  # Max entries returned by one leaderboard page
+app.config['RANK_NEIGHBOUR_RADIUS'] = 5  # Players shown above and below in /api/rank
+app.config['LEADERBOARD_KEEP_PERIODS'] = 1  # Past daily/weekly periods kept before pruning
+app.config['HISTOGRAM_BUCKET_WIDTH'] = 10  # Run rebuild-histogram after changing this
+app.config['MAX_SCORE'] = 1_000_000  # Higher scores are rejected; rank indexes grow with the top score
+app.config['PASSWORD_HASH_WORKERS'] = None  # Hashing processes, defaults to the available cores
+app.config['PASSWORD_HASH_QUEUE'] = 64  # Hashes allowed to wait before returning 503
+app.config['PASSWORD_HASH_RETRY_AFTER'] = 1  # Seconds sent in Retry-After when the queue is full
 
 db = SQLAlchemy(app)
 jwt = JWTManager(app)
 
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+metrics = Metrics()
+metrics.describe('leaderboard_request_duration_seconds', 'histogram', 'Request latency by route.')
+metrics.describe('leaderboard_requests_total', 'counter', 'Requests by route and status code.')
+metrics.describe('leaderboard_sql_queries_per_request', 'histogram', 'SQL statements executed per request.')
+metrics.describe('leaderboard_sql_queries_total', 'counter', 'SQL statements executed, by route or background.')
+metrics.describe('leaderboard_sql_duration_seconds_total', 'counter', 'Time spent in SQL statements, by route or background.')
+metrics.describe('leaderboard_cache_hits_total', 'counter', 'Leaderboard requests served from the cache.')
+metrics.describe('leaderboard_cache_misses_total', 'counter', 'Leaderboard requests that rebuilt the cache.')
+metrics.describe('leaderboard_cache_hit_ratio', 'gauge', 'Share of leaderboard requests served from the cache.')
+metrics.describe('leaderboard_score_commits_total', 'counter', 'Group commits made by the score writer.')
+metrics.describe('leaderboard_scores_committed_total', 'counter', 'Scores written by the score writer.')
+metrics.describe('leaderboard_duplicate_scores_total', 'counter', 'Retried submissions skipped by the score writer.')
+metrics.describe('leaderboard_score_writer_queue_depth', 'gauge', 'Submissions waiting for the score writer.')
+
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
@@ -32,76 +69,701 @@ class Score(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     score = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime)
     user = db.relationship('User', backref=db.backref('scores', lazy=True))
 
-@app.route('/api/register', methods=['POST'])
-def register():
-    data = request.json
-    logger.debug(f"Registration attempt for username: {data.get('username')}")
-    
+# Lets best scores be recomputed per user without scanning the whole table
+db.Index('ix_score_user_score', Score.user_id, Score.score)
+
+class BestScore(db.Model):
+    # One row per user holding their best score, maintained by submit_score so
+    # the leaderboard never has to aggregate the whole score table.
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    score = db.Column(db.Integer, nullable=False)
+    user = db.relationship('User', backref=db.backref('best_score', uselist=False))
+
+# Matches the leaderboard ORDER BY so the top N is a walk over N index entries
+db.Index('ix_best_score_rank', BestScore.score.desc(), BestScore.user_id)
+
+class WindowBestScore(db.Model):
+    # Best score per user within one period of a time window, e.g. the daily
+    # board for 2024-05-01, rolled up incrementally like BestScore.
+    window = db.Column(db.String(10), primary_key=True)
+    period = db.Column(db.String(10), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    score = db.Column(db.Integer, nullable=False)
+    user = db.relationship('User')
+
+db.Index('ix_window_best_score_rank', WindowBestScore.window, WindowBestScore.period,
+         WindowBestScore.score.desc(), WindowBestScore.user_id)
+
+class ScoreSubmission(db.Model):
+    # Client-generated id of every score sent with one, so retried uploads
+    # from the game's offline queue are only counted once
+    id = db.Column(db.String(64), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+
+class ScoreBucket(db.Model):
+    # Number of players whose all-time best falls in [bucket * width, (bucket + 1) * width)
+    bucket = db.Column(db.Integer, primary_key=True)
+    count = db.Column(db.Integer, nullable=False)
+
+ALL_TIME = 'alltime'
+WINDOWS = {'daily': 1, 'weekly': 7}  # Length in days of each windowed leaderboard
+
+def utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def period_key(window, when):
+    if window == 'daily':
+        return when.strftime('%Y-%m-%d')
+    if window == 'weekly':
+        year, week, _ = when.isocalendar()
+        return f"{year}-W{week:02d}"
+    return ALL_TIME
+
+class Board:
+    """Cache and rank index for one leaderboard window's current period."""
+
+    def __init__(self, window):
+        self.window = window
+        self.period = ALL_TIME if window == ALL_TIME else None
+        self.cache = LeaderboardCache(size=10)
+        self.rank_index = RankIndex(max_score=app.config['MAX_SCORE'])
+
+    @property
+    def model(self):
+        return BestScore if self.window == ALL_TIME else WindowBestScore
+
+    def criteria(self):
+        if self.window == ALL_TIME:
+            return []
+        return [WindowBestScore.window == self.window, WindowBestScore.period == self.period]
+
+    def new_entry(self, user_id, score):
+        if self.window == ALL_TIME:
+            return BestScore(user_id=user_id, score=score)
+        return WindowBestScore(window=self.window, period=self.period, user_id=user_id, score=score)
+
+boards = {window: Board(window) for window in (ALL_TIME, *WINDOWS)}
+histogram = ScoreHistogram(app.config['HISTOGRAM_BUCKET_WIDTH'])
+
+def record_best_scores(board, best_by_user):
+    """Raise best scores where beaten and return the (old, new) score changes."""
+    model = board.model
+    existing = {best.user_id: best for best in
+                model.query.filter(*board.criteria(), model.user_id.in_(best_by_user))}
+    changes = []
+    for user_id, score in best_by_user.items():
+        best = existing.get(user_id)
+        if best is None:
+            db.session.add(board.new_entry(user_id, score))
+            changes.append((None, score))
+        elif score > best.score:
+            changes.append((best.score, score))
+            best.score = score
+    return changes
+
+def record_histogram(deltas):
+    existing = {row.bucket: row for row in ScoreBucket.query.filter(ScoreBucket.bucket.in_(deltas))}
+    for bucket, delta in deltas.items():
+        row = existing.get(bucket)
+        if row is None:
+            db.session.add(ScoreBucket(bucket=bucket, count=delta))
+        else:
+            row.count += delta
+
+# Everything below that mutates a board's rank index or rolls its period runs
+# on the score writer thread, so it is serialized with the commits it mirrors.
+
+def prune_windows(window, now):
+    """Drop rollups for periods that have fallen out of the retention limit."""
+    keep_days = WINDOWS[window] * app.config['LEADERBOARD_KEEP_PERIODS']
+    cutoff = period_key(window, now - timedelta(days=keep_days))
+    deleted = WindowBestScore.query.filter(WindowBestScore.window == window,
+                                           WindowBestScore.period < cutoff).delete()
+    db.session.commit()
+    if deleted:
+        logger.info("Pruned %s expired %s leaderboard rows", deleted, window)
+
+def roll_board(board, now):
+    period = period_key(board.window, now)
+    if board.period != period:
+        board.period = period
+        board.rank_index.clear()
+        board.rank_index.loaded = False
+        board.cache.invalidate()
+        prune_windows(board.window, now)
+
+def prepare_board(board):
+    with app.app_context():
+        if board.window != ALL_TIME:
+            roll_board(board, utcnow())
+        if not board.rank_index.loaded:
+            model = board.model
+            board.rank_index.load(db.session.query(model.score, db.func.count()).
+                                  filter(*board.criteria()).group_by(model.score))
+
+def unseen_submissions(rows):
+    """Drop rows whose submission_id is already stored or repeated in rows."""
+    submission_ids = [submission_id for _, _, submission_id in rows if submission_id]
+    if not submission_ids:
+        return rows
+    seen = {submission_id for (submission_id,) in
+            db.session.query(ScoreSubmission.id).filter(ScoreSubmission.id.in_(submission_ids))}
+    fresh = []
+    for row in rows:
+        submission_id = row[2]
+        if submission_id:
+            if submission_id in seen:
+                continue
+            seen.add(submission_id)
+        fresh.append(row)
+    return fresh
+
+def persist_scores(rows):
+    """Insert (user_id, score, submission_id) rows and update every board in one transaction."""
+    now = utcnow()
+    with app.app_context():
+        for window in WINDOWS:
+            roll_board(boards[window], now)
+        try:
+            fresh = unseen_submissions(rows)
+            if len(fresh) < len(rows):
+                metrics.inc('leaderboard_duplicate_scores_total', value=len(rows) - len(fresh))
+                logger.info("Skipped %s already recorded score submissions", len(rows) - len(fresh))
+            rows = fresh
+            if not rows:
+                return
+            best_by_user = {}
+            for user_id, score, _ in rows:
+                best_by_user[user_id] = max(score, best_by_user.get(user_id, score))
+            db.session.execute(db.insert(Score), [{'user_id': user_id, 'score': score, 'created_at': now}
+                                                  for user_id, score, _ in rows])
+            submissions = [{'id': submission_id, 'user_id': user_id}
+                           for user_id, _, submission_id in rows if submission_id]
+            if submissions:
+                db.session.execute(db.insert(ScoreSubmission), submissions)
+            changes = {board: record_best_scores(board, best_by_user) for board in boards.values()}
+            bucket_deltas = histogram.deltas(changes[boards[ALL_TIME]])
+            record_histogram(bucket_deltas)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    metrics.inc('leaderboard_score_commits_total')
+    metrics.inc('leaderboard_scores_committed_total', value=len(rows))
+    # The rows are committed now, so a failure below must not reach the
+    # submitters. Whatever can't be updated is dropped and reloaded instead.
+    top_score = max(best_by_user.values())
+    for board, board_changes in changes.items():
+        try:
+            with board.rank_index.lock:
+                if board.rank_index.loaded:
+                    for old_score, new_score in board_changes:
+                        board.rank_index.move(old_score, new_score)
+        except Exception:
+            logger.exception("Failed to update the %s rank index, reloading it", board.window)
+            board.rank_index.loaded = False
+            board.cache.invalidate()
+        else:
+            board.cache.score_submitted(top_score)
+    try:
+        if histogram.loaded:
+            histogram.apply(bucket_deltas)
+    except Exception:
+        logger.exception("Failed to update the score histogram, reloading it")
+        histogram.loaded = False
+    logger.debug("Group commit of %s scores", len(rows))
+
+score_writer = ScoreWriter(
+    persist_scores,
+    max_batch=app.config['SCORE_WRITER_MAX_BATCH'],
+    max_delay=app.config['SCORE_WRITER_MAX_DELAY']
+)
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    context.query_start = time.perf_counter()
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def record_query_time(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context.query_start
+    if has_request_context() and 'sql_queries' in g:
+        g.sql_queries += 1
+        g.sql_time += elapsed
+    else:
+        labels = (('route', 'background'),)
+        metrics.inc('leaderboard_sql_queries_total', labels)
+        metrics.inc('leaderboard_sql_duration_seconds_total', labels, elapsed)
+
+@app.before_request
+def start_request_metrics():
+    g.request_start = time.perf_counter()
+    g.sql_queries = 0
+    g.sql_time = 0.0
+
+@app.after_request
+def record_request_metrics(response):
+    if 'request_start' not in g:
+        return response
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    labels = (('route', route), ('method', request.method))
+    metrics.observe('leaderboard_request_duration_seconds', labels, time.perf_counter() - g.request_start)
+    metrics.inc('leaderboard_requests_total', labels + (('status', response.status_code),))
+    route_label = (('route', route),)
+    metrics.observe('leaderboard_sql_queries_per_request', route_label, g.sql_queries, COUNT_BUCKETS)
+    metrics.inc('leaderboard_sql_queries_total', route_label, g.sql_queries)
+    metrics.inc('leaderboard_sql_duration_seconds_total', route_label, g.sql_time)
+    return response
+
+def server_samples():
+    for window, board in boards.items():
+        labels = (('window', window),)
+        hits, misses = board.cache.hits, board.cache.misses
+        yield 'leaderboard_cache_hits_total', labels, hits
+        yield 'leaderboard_cache_misses_total', labels, misses
+        if hits + misses:
+            yield 'leaderboard_cache_hit_ratio', labels, hits / (hits + misses)
+    yield 'leaderboard_score_writer_queue_depth', (), score_writer.pending.qsize()
+
+metrics.add_collector(server_samples)
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    return app.response_class(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+password_hasher = PasswordHasher(
+    workers=app.config['PASSWORD_HASH_WORKERS'],
+    queue_size=app.config['PASSWORD_HASH_QUEUE'],
+    retry_after=app.config['PASSWORD_HASH_RETRY_AFTER']
+)
+
+def write_scores(rows):
+    # On SQLite an open read transaction in this request would block the
+    # writer thread's commit, so release it before waiting.
+    db.session.close()
+    score_writer.submit(rows).result(timeout=app.config['SCORE_WRITER_TIMEOUT'])
+
+def current_board(window):
+    board = boards[window]
+    if board.period != period_key(window, utcnow()) or not board.rank_index.loaded:
+        db.session.close()
+        score_writer.call(lambda: prepare_board(board)).result(timeout=app.config['SCORE_WRITER_TIMEOUT'])
+    return board
+
+def load_histogram():
+    with app.app_context():
+        if not histogram.loaded:
+            histogram.load(db.session.query(ScoreBucket.bucket, ScoreBucket.count))
+
+def current_histogram():
+    if not histogram.loaded:
+        db.session.close()
+        score_writer.call(load_histogram).result(timeout=app.config['SCORE_WRITER_TIMEOUT'])
+    return histogram
+
+# Schema changes for databases created by earlier versions, applied in order
+# by online_migrate at startup or ahead of a deploy. Never edit a shipped step;
+# add a new one.
+MIGRATIONS = [
+    # Scores recorded before this existed keep a NULL timestamp
+    AddColumn('score_created_at', 'score', 'created_at', 'DATETIME'),
+    BuildIndexes('score_user_score_index', 'score', {
+        'ix_score_user_score': 'CREATE INDEX ix_score_user_score ON {table} (user_id, score)'
+    }),
+    Backfill('best_score_from_scores', 'user', """
+        INSERT INTO best_score (user_id, score)
+        SELECT user_id, MAX(score) FROM score WHERE user_id > :start AND user_id <= :end GROUP BY user_id
+        ON CONFLICT(user_id) DO UPDATE SET score = MAX(best_score.score, excluded.score)
+    """),
+]
+
+def database_path():
+    return make_url(app.config['SQLALCHEMY_DATABASE_URI']).database
+
+def backfill_best_scores():
+    db.session.query(BestScore).delete()
+    db.session.execute(
+        db.insert(BestScore).from_select(
+            ['user_id', 'score'],
+            db.select(Score.user_id, db.func.max(Score.score)).group_by(Score.user_id)
+        )
+    )
+    db.session.commit()
+    board = boards[ALL_TIME]
+    board.cache.invalidate()
+    board.rank_index.loaded = False
+    rebuild_histogram()
+    return db.session.query(BestScore).count()
+
+def rebuild_histogram():
+    """Recount the score buckets from the best_score table."""
+    bucket = db.case((BestScore.score < 0, 0), else_=BestScore.score) // histogram.width
+    db.session.query(ScoreBucket).delete()
+    db.session.execute(
+        db.insert(ScoreBucket).from_select(
+            ['bucket', 'count'],
+            db.select(bucket, db.func.count()).group_by(bucket)
+        )
+    )
+    db.session.commit()
+    histogram.loaded = False
+    return db.session.query(ScoreBucket).count()
+
+@app.cli.command('backfill-best-scores')
+def backfill_best_scores_command():
+    """Rebuild the best_score table from the full score history."""
+    count = backfill_best_scores()
+    print(f"Backfilled best scores for {count} users.")
+
+@app.cli.command('rebuild-histogram')
+def rebuild_histogram_command():
+    """Rebuild the score histogram from players' best scores."""
+    count = rebuild_histogram()
+    print(f"Rebuilt {count} score histogram buckets.")
+
+@app.cli.command('prune-leaderboards')
+def prune_leaderboards_command():
+    """Delete windowed leaderboard rows for expired periods."""
+    for window in WINDOWS:
+        prune_windows(window, utcnow())
+
+# The handlers below take plain arguments and return (payload, status) so the
+# Flask routes and async_leaderboard_server can share them. They must run
+# inside an app context.
+
+def credentials_error(data):
     if not data or 'username' not in data or 'password' not in data:
-        return jsonify({"error": "Missing username or password"}), 400
+        return {"error": "Missing username or password"}, 400
+    return None
+
+# Registration and login are split around the password hash so the async
+# server can wait for the hashing process on its event loop instead of in a
+# database thread.
+
+def username_taken(username):
+    logger.debug("Registration attempt for username: %s", username)
     
-    if User.query.filter_by(username=data['username']).first():
-        logger.warning(f"Registration failed: Username {data['username']} already exists")
-        return jsonify({"error": "Username already exists"}), 400
+    if User.query.filter_by(username=username).first():
+        logger.warning("Registration failed: Username %s already exists", username)
+        return {"error": "Username already exists"}, 400
     
-    new_user = User(
-        username=data['username'],
-        password_hash=generate_password_hash(data['password'])
-    )
-    db.session.add(new_user)
+    # Don't hold the read transaction open while a worker process hashes
+    db.session.close()
+    return None
+
+def add_user(username, password_hash):
+    db.session.add(User(username=username, password_hash=password_hash))
     db.session.commit()
     
-    logger.info(f"User registered successfully: {data['username']}")
-    return jsonify({"message": "User registered successfully"}), 201
+    logger.info("User registered successfully: %s", username)
+    return {"message": "User registered successfully"}, 201
 
-@app.route('/api/login', methods=['POST'])
-def login():
-    data = request.json
-    logger.debug(f"Login attempt for username: {data.get('username')}")
+def register_user(data):
+    error = credentials_error(data) or username_taken(data['username'])
+    if error:
+        return error
+    return add_user(data['username'], password_hasher.hash(data['password']).result())
+
+def stored_password(username):
+    """Return (user_id, password_hash), or (None, None) for an unknown user."""
+    logger.debug("Login attempt for username: %s", username)
     
-    user = User.query.filter_by(username=data['username']).first()
-    if user and check_password_hash(user.password_hash, data['password']):
-        access_token = create_access_token(identity=user.id)
-        logger.info(f"Login successful for user: {user.username}")
-        return jsonify(access_token=access_token), 200
+    user = User.query.filter_by(username=username).first()
+    user_id, password_hash = (user.id, user.password_hash) if user else (None, None)
+    db.session.close()
+    return user_id, password_hash
+
+def login_response(username, user_id, password_valid):
+    if user_id is not None and password_valid:
+        access_token = create_access_token(identity=user_id)
+        logger.info("Login successful for user: %s", username)
+        return {"access_token": access_token}, 200
     
-    logger.warning(f"Login failed for username: {data.get('username')}")
-    return jsonify({"error": "Invalid username or password"}), 401
+    logger.warning("Login failed for username: %s", username)
+    return {"error": "Invalid username or password"}, 401
+
+def login_user(data):
+    error = credentials_error(data)
+    if error:
+        return error
+    user_id, password_hash = stored_password(data['username'])
+    password_valid = user_id is not None and password_hasher.check(password_hash, data['password']).result()
+    return login_response(data['username'], user_id, password_valid)
+
+def leaderboard_entries(board, query):
+    return [{'rank': board.rank_index.rank(row.score), 'name': row.username, 'score': row.score} for row in query]
+
+def build_leaderboard(board):
+    model = board.model
+    scores = db.session.query(User.username, model.score).\
+        join(model.user).filter(*board.criteria()).\
+        order_by(model.score.desc(), model.user_id).limit(board.cache.size)
+    logger.info("%s leaderboard rebuilt from database", board.window)
+    return leaderboard_entries(board, scores)
+
+def tied_scores(board, key):
+    """Filter for the rows the rank index counts under key, including the clamped ends."""
+    model = board.model
+    if key == 0:
+        return model.score <= 0
+    if key == board.rank_index.max_score:
+        return model.score >= key
+    return model.score == key
+
+# Pages are read by key on the (score DESC, user_id) rank index, starting
+# from a known row, so the database never steps over the rows before it.
+
+def ranked_scores(board, *filters):
+    model = board.model
+    return db.session.query(User.username, model.score).join(model.user).filter(*board.criteria(), *filters)
+
+def page_from(board, score, user_id, limit, inclusive=False):
+    """Up to limit entries following the player with this score and id, or from them if inclusive."""
+    model = board.model
+    rows = ranked_scores(board, model.score == score, model.user_id >= user_id if inclusive else model.user_id > user_id).\
+        order_by(model.user_id).limit(limit).all()
+    if len(rows) < limit:
+        rows += ranked_scores(board, model.score < score).\
+            order_by(model.score.desc(), model.user_id).limit(limit - len(rows)).all()
+    return leaderboard_entries(board, rows)
+
+def page_before(board, score, user_id, limit):
+    """Up to limit entries directly ahead of the player with this score and id."""
+    model = board.model
+    rows = ranked_scores(board, model.score == score, model.user_id < user_id).\
+        order_by(model.user_id.desc()).limit(limit).all()
+    if len(rows) < limit:
+        rows += ranked_scores(board, model.score > score).\
+            order_by(model.score, model.user_id.desc()).limit(limit - len(rows)).all()
+    return leaderboard_entries(board, reversed(rows))
+
+def leaderboard_page(board, offset, limit):
+    # Jump straight to the score at this offset via the rank index. Only the
+    # ties before the offset are stepped over, in the index alone, to find
+    # the row the page starts from.
+    key = board.rank_index.score_at(offset)
+    if key is None:
+        return []
+    ties_to_skip = offset - board.rank_index.count_above(key)
+    model = board.model
+    first = db.session.query(model.score, model.user_id).filter(*board.criteria(), tied_scores(board, key)).\
+        order_by(model.score.desc(), model.user_id).offset(ties_to_skip).first()
+    if first is None:
+        return []
+    return page_from(board, first.score, first.user_id, limit, inclusive=True)
+
+def page_after_player(board, username, limit):
+    """The page following username's entry; None if they aren't on this board."""
+    model = board.model
+    last = db.session.query(model.score, model.user_id).join(model.user).\
+        filter(*board.criteria(), User.username == username).first()
+    if last is None:
+        return None
+    return page_from(board, last.score, last.user_id, limit)
+
+def leaderboard_body(window, offset, limit, after=None):
+    """Return (json_bytes, status, etag); only the cached top board has an ETag.
+
+    after is the name on the last entry of the previous page. Paging with it
+    reads by key instead of by position.
+    """
+    if offset < 0 or not 0 < limit <= app.config['LEADERBOARD_PAGE_LIMIT']:
+        return json.dumps({"error": "Invalid offset or limit"}).encode(), 400, None
+    if window not in boards:
+        return json.dumps({"error": "Unknown leaderboard window"}).encode(), 400, None
 
-@app.route('/api/leaderboard', methods=['GET'])
-def get_leaderboard():
     try:
-        scores = db.session.query(User.username, db.func.max(Score.score).label('max_score')).\
-            join(Score).group_by(User.id).order_by(db.desc('max_score')).limit(10).all()
-        
-        leaderboard = [{'name': score.username, 'score': score.max_score} for score in scores]
-        logger.info("Leaderboard fetched successfully")
-        return jsonify(leaderboard)
+        board = current_board(window)
+        if after is not None:
+            page = page_after_player(board, after, limit)
+            if page is None:
+                return json.dumps({"error": "Player not on this leaderboard"}).encode(), 404, None
+            return json.dumps(page).encode(), 200, None
+        if offset != 0 or limit != board.cache.size:
+            return json.dumps(leaderboard_page(board, offset, limit)).encode(), 200, None
+        body, etag = board.cache.get(lambda: build_leaderboard(board))
+        return body, 200, etag
     except Exception as e:
-        logger.error(f"Error fetching leaderboard: {str(e)}")
-        return jsonify({"error": "Failed to fetch leaderboard"}), 500
+        logger.error("Error fetching leaderboard: %s", e)
+        return json.dumps({"error": "Failed to fetch leaderboard"}).encode(), 500, None
 
-@app.route('/api/submit_score', methods=['POST'])
-@jwt_required()
-def submit_score():
-    data = request.json
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
+def rank_for_user(username, window, radius):
+    radius = max(0, min(radius, app.config['LEADERBOARD_PAGE_LIMIT'] // 2))
+    if window not in boards:
+        return {"error": "Unknown leaderboard window"}, 400
+    board = current_board(window)
+
+    user = User.query.filter_by(username=username).first()
+    if not user:
+        return {"error": "User not found"}, 404
+    model = board.model
+    best = model.query.filter(*board.criteria(), model.user_id == user.id).first()
+    if not best:
+        return {"error": "No scores recorded"}, 404
+
+    # Users tied on score are ordered by id, the same as the leaderboard.
+    # Counting them only reads the rank index, not the table.
+    def count(*filters):
+        return db.session.query(db.func.count(model.user_id)).filter(*board.criteria(), *filters).scalar()
+    tied_ahead = count(model.score == best.score, model.user_id < user.id)
+    # Plus higher scores clamped into the same rank index slot, if any
+    tied_ahead += count(tied_scores(board, board.rank_index.key(best.score)), model.score > best.score)
+    position = board.rank_index.count_above(best.score) + tied_ahead
+    above = page_before(board, best.score, user.id, radius)
+    return {
+        'name': user.username,
+        'score': best.score,
+        'rank': board.rank_index.rank(best.score),
+        'players': board.rank_index.total,
+        'offset': position - len(above),
+        'neighbours': above + page_from(board, best.score, user.id, radius + 1, inclusive=True)
+    }, 200
+
+def percentile_for(score):
+    if score is None:
+        return {"error": "Expected an integer score"}, 400
+    scores = current_histogram()
+    return {'score': score, 'percentile': round(scores.percentile(score), 1), 'players': scores.total}, 200
+
+def histogram_summary():
+    scores = current_histogram()
+    return {'bucket_width': scores.width, 'players': scores.total, 'buckets': scores.buckets()}, 200
+
+def valid_score(score):
+    # bool is a subclass of int, but true isn't a score
+    return isinstance(score, int) and not isinstance(score, bool) and 0 <= score <= app.config['MAX_SCORE']
+
+def parse_submission(item):
+    """Return (score, submission_id) for an int or {"score", "submission_id"} item, or None."""
+    if valid_score(item):
+        return item, None
+    if not isinstance(item, dict) or not valid_score(item.get('score')):
+        return None
+    submission_id = item.get('submission_id')
+    if submission_id is not None and not (isinstance(submission_id, str) and 0 < len(submission_id) <= 64):
+        return None
+    return item['score'], submission_id
+
+def submit_score_for(user_id, data):
+    submission = parse_submission(data)
+    if submission is None:
+        return {"error": "Expected an integer score"}, 400
+    user = db.session.get(User, user_id)
     
     if not user:
-        logger.warning(f"Score submission failed: User not found for id {user_id}")
-        return jsonify({"error": "User not found"}), 404
+        logger.warning("Score submission failed: User not found for id %s", user_id)
+        return {"error": "User not found"}, 404
     
-    new_score = Score(user_id=user.id, score=data['score'])
-    db.session.add(new_score)
-    db.session.commit()
+    try:
+        write_scores([(user.id, *submission)])
+    except Exception as e:
+        logger.error("Score submission failed for user %s: %s", user.username, e)
+        return {"error": "Failed to submit score"}, 500
     
-    logger.info(f"Score submitted successfully for user {user.username}: {data['score']}")
-    return jsonify({"message": "Score submitted successfully"}), 200
+    logger.info("Score submitted successfully for user %s: %s", user.username, submission[0])
+    return {"message": "Score submitted successfully"}, 200
 
-if __name__ == '__main__':
+def submit_scores_for(user_id, data):
+    scores = data.get('scores') if isinstance(data, dict) else None
+    submissions = [parse_submission(item) for item in scores] if isinstance(scores, list) else [None]
+    if None in submissions:
+        return {"error": "Expected a list of integer scores"}, 400
+    if len(scores) > app.config['SCORE_BATCH_LIMIT']:
+        return {"error": f"At most {app.config['SCORE_BATCH_LIMIT']} scores per request"}, 400
+
+    user = db.session.get(User, user_id)
+    if not user:
+        logger.warning("Score submission failed: User not found for id %s", user_id)
+        return {"error": "User not found"}, 404
+
+    if scores:
+        try:
+            write_scores([(user.id, *submission) for submission in submissions])
+        except Exception as e:
+            logger.error("Batch score submission failed for user %s: %s", user.username, e)
+            return {"error": "Failed to submit scores"}, 500
+
+    logger.info("%s scores submitted successfully for user %s", len(scores), user.username)
+    return {"message": "Scores submitted successfully", "count": len(scores)}, 200
+
+@app.errorhandler(HasherBusy)
+def hasher_busy(e):
+    logger.warning("Password hashing queue full, rejecting %s", request.path)
+    response = jsonify({"error": "Server busy, try again shortly"})
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response, 503
+
+@app.route('/api/register', methods=['POST'])
+def register():
+    payload, status = register_user(request.json)
+    return jsonify(payload), status
+
+@app.route('/api/login', methods=['POST'])
+def login():
+    payload, status = login_user(request.json)
+    return jsonify(payload), status
+
+@app.route('/api/leaderboard', methods=['GET'])
+def get_leaderboard():
+    body, status, etag = leaderboard_body(
+        request.args.get('window', ALL_TIME),
+        request.args.get('offset', 0, type=int),
+        request.args.get('limit', 10, type=int),
+        request.args.get('after')
+    )
+    if etag and request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(body, status=status, mimetype='application/json')
+    if etag:
+        response.set_etag(etag)
+    return response
+
+@app.route('/api/rank/<path:username>', methods=['GET'])
+def get_rank(username):
+    payload, status = rank_for_user(
+        username,
+        request.args.get('window', ALL_TIME),
+        request.args.get('radius', app.config['RANK_NEIGHBOUR_RADIUS'], type=int)
+    )
+    return jsonify(payload), status
+
+@app.route('/api/percentile', methods=['GET'])
+def get_percentile():
+    payload, status = percentile_for(request.args.get('score', type=int))
+    return jsonify(payload), status
+
+@app.route('/api/histogram', methods=['GET'])
+def get_histogram():
+    payload, status = histogram_summary()
+    return jsonify(payload), status
+
+@app.route('/api/submit_score', methods=['POST'])
+@jwt_required()
+def submit_score():
+    payload, status = submit_score_for(get_jwt_identity(), request.json)
+    return jsonify(payload), status
+
+@app.route('/api/submit_scores', methods=['POST'])
+@jwt_required()
+def submit_scores():
+    payload, status = submit_scores_for(get_jwt_identity(), request.json)
+    return jsonify(payload), status
+
+def init_db():
     with app.app_context():
         db.create_all()
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    run_migrations(database_path(), MIGRATIONS)
+    with app.app_context():
+        # For databases created before the score histogram existed
+        if not db.session.query(ScoreBucket).first() and db.session.query(BestScore).first():
+            count = rebuild_histogram()
+            logger.info("Rebuilt %s score histogram buckets", count)
+
+if __name__ == '__main__':
+    setup_logging({'leaderboard_server': 'DEBUG'})
+    init_db()
+    app.run(debug=True, port=5000)
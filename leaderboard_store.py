@@ -0,0 +1,98 @@
+import asyncio
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "leaderboard_cache.json")
+
+class LeaderboardStore:
+    """Client cache of leaderboard and rank responses.
+
+    Menus draw whatever is cached straight away and revalidate in the
+    background once an entry is older than ttl seconds (stale while
+    revalidate). Concurrent fetches of the same resource share one request.
+    Entries, with the leaderboard ETags, are saved to disk so the first
+    leaderboard after launch draws instantly and can revalidate with a 304.
+    """
+
+    def __init__(self, server_comm, path=CACHE_FILE, ttl=30):
+        self.server_comm = server_comm
+        self.path = path
+        self.ttl = ttl
+        self.entries = {}  # key -> {"data", "fetched_at", "etag"}
+        self.in_flight = {}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable leaderboard cache: %s", e)
+            return
+        for key, entry in self.entries.items():
+            kind, _, window = key.partition(":")
+            if kind == "leaderboard" and entry.get("etag"):
+                self.server_comm.leaderboards[window] = (entry["etag"], entry["data"])
+
+    def save(self):
+        temp_path = self.path + ".tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logger.warning("Could not save leaderboard cache: %s", e)
+
+    def cached(self, key):
+        """Return (data, fresh) for key, with data None when nothing is cached."""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None, False
+        return entry["data"], time.time() - entry["fetched_at"] < self.ttl
+
+    def invalidate(self):
+        """Mark every entry stale, e.g. after a score is submitted."""
+        for entry in self.entries.values():
+            entry["fetched_at"] = 0
+
+    async def refresh(self, key, fetch, etag=None):
+        task = self.in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self.store(key, fetch, etag))
+            self.in_flight[key] = task
+            task.add_done_callback(lambda _: self.in_flight.pop(key, None))
+        # A cancelled caller must not cancel the request other callers share
+        return await asyncio.shield(task)
+
+    async def store(self, key, fetch, etag):
+        data = await fetch()
+        self.entries[key] = {"data": data, "fetched_at": time.time(), "etag": etag() if etag else None}
+        self.save()
+        return data
+
+    def leaderboard_key(self, window):
+        return f"leaderboard:{window}"
+
+    def rank_key(self, username, window):
+        return f"rank:{window}:{username}"
+
+    def cached_leaderboard(self, window):
+        return self.cached(self.leaderboard_key(window))
+
+    def cached_rank(self, username, window):
+        return self.cached(self.rank_key(username, window))
+
+    async def fetch_leaderboard(self, window):
+        return await self.refresh(self.leaderboard_key(window),
+                                  lambda: self.server_comm.get_leaderboard(window),
+                                  lambda: self.server_comm.leaderboards.get(window, (None, None))[0])
+
+    async def fetch_rank(self, username, window):
+        return await self.refresh(self.rank_key(username, window),
+                                  lambda: self.server_comm.get_rank(username, window))
@@ -0,0 +1,232 @@
+"""Load test for the leaderboard server.
+
+Starts leaderboard_server in a child process against a temporary SQLite file,
+then drives simulated players through register, login, submit_score and
+leaderboard/rank fetches using the game's own ServerCommunication client.
+
+    python load_test.py --clients 2000 --concurrency 200 --output run.json
+    python load_test.py --baseline run.json   # exit 1 on a regression
+    python load_test.py --server aiohttp      # test async_leaderboard_server
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import statistics
+import sys
+import tempfile
+import time
+
+import aiohttp
+
+from log_setup import setup_logging
+from server_communication import ServerCommunication
+
+ENDPOINTS = ["register", "login", "submit_score", "leaderboard", "rank"]
+
+def exit_on_terminate():
+    # Raise SystemExit so the server's finally block stops the hashing pool
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+def run_server(database_uri, port_queue):
+    exit_on_terminate()
+    os.environ['LEADERBOARD_DATABASE_URI'] = database_uri
+    from werkzeug.serving import make_server
+    from leaderboard_server import app, db, password_hasher
+
+    setup_logging({'': 'WARNING', 'werkzeug': 'WARNING'})
+    with app.app_context():
+        db.create_all()
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    port_queue.put(server.server_port)
+    try:
+        server.serve_forever()
+    finally:
+        password_hasher.shutdown()
+
+def run_async_server(database_uri, port_queue):
+    exit_on_terminate()
+    os.environ['LEADERBOARD_DATABASE_URI'] = database_uri
+    from aiohttp import web
+    from async_leaderboard_server import create_app
+    from leaderboard_server import app, db, password_hasher
+
+    setup_logging({'': 'WARNING'})
+    with app.app_context():
+        db.create_all()
+
+    async def serve():
+        runner = web.AppRunner(create_app(), access_log=None)
+        await runner.setup()
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        await web.SockSite(runner, sock).start()
+        port_queue.put(sock.getsockname()[1])
+        await asyncio.Event().wait()
+
+    try:
+        asyncio.run(serve())
+    finally:
+        password_hasher.shutdown()
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+class LoadTest:
+    def __init__(self, server, base_url, clients, concurrency, games):
+        self.server = server
+        self.base_url = base_url
+        self.clients = clients
+        self.concurrency = concurrency
+        self.games = games
+        self.latencies = {endpoint: [] for endpoint in ENDPOINTS}
+        self.errors = {endpoint: 0 for endpoint in ENDPOINTS}
+
+    async def timed(self, endpoint, call):
+        start = time.perf_counter()
+        try:
+            result = await call
+        except Exception:
+            result = None
+            ok = False
+        else:
+            # Most client calls report failure as a (False, message) tuple
+            ok = not (isinstance(result, tuple) and not result[0])
+        self.latencies[endpoint].append(time.perf_counter() - start)
+        if not ok:
+            self.errors[endpoint] += 1
+        return ok
+
+    async def play(self, player_id, semaphore, connector):
+        async with semaphore:
+            comm = ServerCommunication(self.base_url, connector=connector)
+            username = f"loadtest_{player_id}"
+            password = "password"
+            try:
+                await self.timed("register", comm.register(username, password))
+                if not await self.timed("login", comm.login(username, password)):
+                    return
+                for _ in range(self.games):
+                    await self.timed("submit_score", comm.submit_score(random.randint(0, 500)))
+                    await self.timed("leaderboard", comm.get_leaderboard())
+                    await self.timed("rank", comm.get_rank(username))
+            finally:
+                await comm.close()
+
+    async def run(self):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        # Players share one pool, so connections stay warm between them
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        start = time.perf_counter()
+        try:
+            await asyncio.gather(*(self.play(i, semaphore, connector) for i in range(self.clients)))
+        finally:
+            await connector.close()
+        return time.perf_counter() - start
+
+    def report(self, elapsed):
+        endpoints = {}
+        for endpoint in ENDPOINTS:
+            values = sorted(self.latencies[endpoint])
+            ms = lambda pct: round(percentile(values, pct) * 1000, 3) if values else None
+            endpoints[endpoint] = {
+                "requests": len(values),
+                "errors": self.errors[endpoint],
+                "throughput": round(len(values) / elapsed, 2),
+                "mean_ms": round(statistics.fmean(values) * 1000, 3) if values else None,
+                "p50_ms": ms(50),
+                "p95_ms": ms(95),
+                "p99_ms": ms(99),
+                "max_ms": round(values[-1] * 1000, 3) if values else None,
+            }
+        total = sum(len(values) for values in self.latencies.values())
+        return {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "server": self.server,
+            "clients": self.clients,
+            "concurrency": self.concurrency,
+            "games": self.games,
+            "elapsed_s": round(elapsed, 3),
+            "throughput": round(total / elapsed, 2),
+            "endpoints": endpoints,
+        }
+
+def print_report(results):
+    print(f"{results['server']} server, {results['clients']} clients, concurrency {results['concurrency']}, "
+          f"{results['games']} games each: {results['throughput']} req/s over {results['elapsed_s']}s")
+    print(f"{'endpoint':<14}{'reqs':>8}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for endpoint, stats in results["endpoints"].items():
+        if stats["requests"]:
+            print(f"{endpoint:<14}{stats['requests']:>8}{stats['errors']:>8}{stats['throughput']:>10}"
+                  f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}")
+
+def compare(results, baseline, tolerance):
+    """Return a list of regressions against a previous run's results."""
+    regressions = []
+    if results["throughput"] < baseline["throughput"] * (1 - tolerance):
+        regressions.append(f"throughput {results['throughput']} < baseline {baseline['throughput']}")
+    for endpoint, stats in results["endpoints"].items():
+        old = baseline["endpoints"].get(endpoint)
+        if not old or not old["requests"] or not stats["requests"]:
+            continue
+        for key in ("p95_ms", "p99_ms"):
+            if stats[key] > old[key] * (1 + tolerance):
+                regressions.append(f"{endpoint} {key} {stats[key]} > baseline {old[key]}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=1000, help="simulated players")
+    parser.add_argument("--concurrency", type=int, default=100, help="players active at once")
+    parser.add_argument("--games", type=int, default=3, help="games each player submits")
+    parser.add_argument("--server", choices=["flask", "aiohttp"], default="flask", help="server implementation to test")
+    parser.add_argument("--output", default="load_test_results.json", help="where to save the results")
+    parser.add_argument("--baseline", help="previous results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression, as a fraction")
+    args = parser.parse_args()
+
+    # Read before the run, which may overwrite it when --output is the same file
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    setup_logging({'': 'WARNING'})
+    with tempfile.TemporaryDirectory() as tmp:
+        context = multiprocessing.get_context("spawn")
+        port_queue = context.Queue()
+        database_uri = "sqlite:///" + os.path.join(tmp, "load_test.db")
+        target = run_async_server if args.server == "aiohttp" else run_server
+        # Not a daemon: the server starts its own password hashing processes
+        server = context.Process(target=target, args=(database_uri, port_queue))
+        server.start()
+        try:
+            port = port_queue.get(timeout=30)
+            load_test = LoadTest(args.server, f"http://127.0.0.1:{port}/api", args.clients, args.concurrency, args.games)
+            elapsed = asyncio.run(load_test.run())
+        finally:
+            server.terminate()
+            server.join()
+
+    results = load_test.report(elapsed)
+    print_report(results)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Shared logging setup for the game client and the leaderboard server.
+
+Loggers only put records on a queue; a background thread formats and writes
+them, so neither request handlers nor the frame loop wait on logging I/O.
+High-volume DEBUG lines are rate limited per call site.
+
+Levels are configured per module with TWISTER_LOG_LEVELS, e.g.
+
+    TWISTER_LOG_LEVELS="INFO,leaderboard_server=DEBUG,werkzeug=WARNING"
+
+where a bare level applies to the root logger.
+"""
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+QUEUE_SIZE = 10000
+
+_listener = None
+_lock = threading.Lock()
+
+def parse_levels(spec):
+    levels = {}
+    for part in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, level = part.rpartition("=")
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+class RateLimitFilter(logging.Filter):
+    """Token bucket per call site for records at or below max_level.
+
+    Suppressed records are counted and the count is appended to the next
+    record from the same call site that gets through.
+    """
+
+    def __init__(self, rate=20.0, burst=50, max_level=logging.DEBUG):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.max_level = max_level
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno > self.max_level:
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self.lock:
+            tokens, last, suppressed = self.buckets.get(key, (self.burst, now, 0))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens < 1:
+                self.buckets[key] = (tokens, now, suppressed + 1)
+                return False
+            self.buckets[key] = (tokens - 1, now, 0)
+        if suppressed:
+            record.msg = f"{record.msg} [{suppressed} similar messages suppressed]"
+        return True
+
+class BackgroundQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that defers formatting to the listener thread and drops
+    records instead of blocking when the queue is full."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+def setup_logging(levels=None, debug_rate=None, stream=None):
+    """Install the queued logging pipeline once per process.
+
+    levels maps logger names to level names, with "" for the root logger, and
+    is merged over TWISTER_LOG_LEVELS.
+    """
+    global _listener
+    with _lock:
+        if _listener is not None:
+            return
+        config = {"": "INFO"}
+        config.update(parse_levels(os.environ.get("TWISTER_LOG_LEVELS", "")))
+        config.update(levels or {})
+        if debug_rate is None:
+            debug_rate = float(os.environ.get("TWISTER_LOG_DEBUG_RATE", "20"))
+
+        log_queue = queue.Queue(QUEUE_SIZE)
+        queue_handler = BackgroundQueueHandler(log_queue)
+        queue_handler.addFilter(RateLimitFilter(rate=debug_rate, burst=max(1, int(debug_rate * 2))))
+
+        output = logging.StreamHandler(stream or sys.stderr)
+        output.setFormatter(logging.Formatter(LOG_FORMAT))
+
+        root = logging.getLogger()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+        for name, level in config.items():
+            logging.getLogger(name or None).setLevel(level)
+
+        _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+def shutdown_logging():
+    """Flush queued records and stop the background writer."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
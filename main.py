@@ -1,12 +1,16 @@
 import pygame
 import asyncio
+import math
 import logging
+import random
+import time
+import numpy as np
 from player import Player
-from dot import Dot
+from dot_field import DotField, GOOD_DOT, BAD_DOT, DOT_COLORS
 from twister import Twister
 from background_particle import BackgroundParticle
 from game_settings import *
-from sound_manager import SoundManager
+from sound_manager import SoundManager, SilentSoundManager
 from game_menu import GameMenu
 from settings_menu import SettingsMenu
 from pause_menu import PauseMenu
@@ -14,9 +18,16 @@ from leaderboard_menu import LeaderboardMenu
 from login_menu import LoginMenu
 from font_manager import FontManager
 from server_communication import server_comm
+from task_scheduler import TaskScheduler
+from score_queue import ScoreQueue, is_permanent, AUTH_STATUSES
+from leaderboard_store import LeaderboardStore
 from power_up import PowerUpManager
 from achievements import AchievementManager
 from particle import ParticleSystem
+from replay import Replay, save_replay
+from frame_profiler import FrameProfiler, create_profiler
+from dirty_renderer import DirtyRenderer
+from log_setup import setup_logging
 
 class GameState:
     MENU = 0
@@ -28,60 +39,102 @@ class GameState:
     LOGIN = 6
 
 class TwisterGame:
-    def __init__(self):
-        pygame.init()
+    def __init__(self, headless=False, seed=None):
+        """headless runs only the game logic, with no display, audio or menus.
+        seed makes the sequence of game seeds repeatable."""
+        self.headless = headless
+        self.seed_rng = random.Random(seed)
         self.setup_logger()
-        self.setup_display()
-        self.setup_game_components()
+        if headless:
+            self.setup_headless_components()
+        else:
+            pygame.init()
+            self.setup_display()
+            self.setup_game_components()
         self.initialize_game_state()
         self.state = GameState.MENU
         self.previous_state = None
+        self.rendered_state = None
+        self.redraw_needed = True
         self.score_submitted = False
         self.is_logged_in = False
         self.username = ""
 
     def setup_logger(self):
         self.logger = logging.getLogger(__name__)
-        self.logger.setLevel(logging.INFO)
 
     def setup_display(self):
         self.screen = pygame.display.set_mode((GAME_WIDTH, GAME_HEIGHT))
         pygame.display.set_caption("Twister Game")
 
-    def setup_game_components(self):
-        self.clock = pygame.time.Clock()
-        self.sound_manager = SoundManager()
-        self.font_manager = FontManager(FONT_FILE)
-        self.game_menu = GameMenu(self.screen, self.sound_manager, self.font_manager)
-        self.settings_menu = SettingsMenu(self.screen, self.sound_manager, self.font_manager)
-        self.pause_menu = PauseMenu(self.screen, self.sound_manager, self.font_manager)
-        self.leaderboard_menu = LeaderboardMenu(self.screen, self.font_manager, server_comm)
-        self.login_menu = LoginMenu(self.screen, self.font_manager, server_comm)
-        self.power_up_manager = PowerUpManager()
-        self.achievement_manager = AchievementManager()
-        self.particle_system = ParticleSystem()
-
-    def initialize_game_state(self):
-        self.player = Player()
-        self.dots = []
-        self.twister = Twister()
+    def initialize_game_state(self, seed=None):
+        # Gameplay and effects draw from separate streams, so particles never change how a seed plays
+        self.seed = self.seed_rng.getrandbits(32) if seed is None else seed
+        self.rng = random.Random(self.seed)
+        self.effects_rng = random.Random(f"{self.seed}:effects")
+        self.toggles = []
+        self.script = iter(())
+        self.next_toggle = None
+        self.playback = False
+        self.power_up_manager = PowerUpManager(self.rng)
+        self.particle_system = ParticleSystem(self.effects_rng)
+        self.player = Player(self.headless)
+        self.dots = DotField()
+        self.twister = Twister(self.headless)
         self.score = 0
         self.game_over = False
         self.clockwise = True
         self.difficulty_multiplier = 1
-        self.frames_since_last_spawn = 0
+        self.ticks_since_last_spawn = 0
+        self.ticks = 0
         self.time = 0
-        self.background_particles = [BackgroundParticle() for _ in range(50)]
+        self.background_particles = [] if self.headless else [BackgroundParticle(self.effects_rng) for _ in range(50)]
+
+    def start_game(self, seed=None, toggles=None):
+        """Start a game, replaying the direction toggles at the given ticks if toggles is set."""
+        self.state = GameState.PLAYING
+        self.initialize_game_state(seed)
+        if toggles is not None:
+            self.playback = True
+            self.script = iter(toggles)
+            self.next_toggle = next(self.script, None)
 
     async def run(self):
         running = True
-        while running:
-            self.clock.tick(FPS)
-            running = await self.handle_events()
-            self.update()
-            self.render()
-            await asyncio.sleep(0)  # Allow other async operations to run
-        pygame.quit()
+        tick_length = 1 / TICK_RATE
+        accumulator = 0.0
+        previous_time = time.perf_counter()
+        try:
+            while running:
+                self.clock.tick(FPS)
+                self.profiler.begin_frame()
+                now = time.perf_counter()
+                # Clamped so a long stall doesn't leave the simulation trying to catch up forever
+                accumulator += min(now - previous_time, MAX_FRAME_TIME)
+                previous_time = now
+                started = self.profiler.start()
+                running = self.handle_events()
+                self.profiler.stop("events", started)
+                started = self.profiler.start()
+                if self.task_scheduler.run_callbacks():
+                    self.redraw_needed = True
+                self.flush_scores()
+                self.profiler.stop("callbacks", started)
+                started = self.profiler.start()
+                ticks = 0
+                while accumulator >= tick_length:
+                    self.update()
+                    accumulator -= tick_length
+                    ticks += 1
+                self.profiler.stop("update", started)
+                self.render(accumulator / tick_length)
+                self.profiler.end_frame(ticks)
+                await asyncio.sleep(0)  # Allow other async operations to run
+        finally:
+            self.profiler.close()
+            await self.task_scheduler.shutdown()
+            await server_comm.close()
+            pygame.quit()
 
     def setup_game_components(self):
         self.clock = pygame.time.Clock()
@@ -90,34 +143,49 @@ class TwisterGame:
         self.game_menu = GameMenu(self.screen, self.sound_manager, self.font_manager)
         self.settings_menu = SettingsMenu(self.screen, self.sound_manager, self.font_manager)
         self.pause_menu = PauseMenu(self.screen, self.sound_manager, self.font_manager)
-        self.leaderboard_menu = LeaderboardMenu(self.screen, self.font_manager, server_comm)
-        self.login_menu = LoginMenu(self.screen, self.font_manager, server_comm)
-        self.power_up_manager = PowerUpManager()
+        self.task_scheduler = TaskScheduler()
+        self.score_queue = ScoreQueue()
+        self.refused_token = None  # Token the server turned down, not worth sending again
+        self.leaderboard_store = LeaderboardStore(server_comm)
+        self.leaderboard_menu = LeaderboardMenu(self.screen, self.font_manager, server_comm, self.task_scheduler,
+                                                self.leaderboard_store)
+        self.login_menu = LoginMenu(self.screen, self.font_manager, server_comm, self.task_scheduler, self.logged_in)
         self.achievement_manager = AchievementManager()
-        self.particle_system = ParticleSystem()
+        self.profiler = create_profiler()
+        self.renderer = DirtyRenderer(self.screen)
 
-    async def handle_events(self):
+    def setup_headless_components(self):
+        self.sound_manager = SilentSoundManager()
+        self.achievement_manager = AchievementManager()
+        self.profiler = FrameProfiler()
+
+    def handle_events(self):
         for event in pygame.event.get():
+            self.redraw_needed = True
             if event.type == pygame.QUIT:
                 return False
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                self.profiler.toggle_overlay()
+                continue
             if self.state == GameState.MENU:
                 menu_action = self.game_menu.handle_input(event)
                 if menu_action == "quit":
                     return False
                 elif menu_action == "startgame":
-                    self.state = GameState.PLAYING
-                    self.initialize_game_state()
+                    self.start_game()
                 elif menu_action == "settings":
                     self.state = GameState.SETTINGS
                 elif menu_action == "leaderboard":
                     self.state = GameState.LEADERBOARD
-                    await self.leaderboard_menu.fetch_leaderboard()
+                    self.leaderboard_menu.fetch_leaderboard()
+                    if self.is_logged_in:
+                        self.leaderboard_menu.fetch_rank(self.username)
                 elif menu_action == "login":
                     self.state = GameState.LOGIN
             elif self.state == GameState.PLAYING:
                 self.handle_game_event(event)
             elif self.state == GameState.GAME_OVER:
-                await self.handle_game_over_event(event)
+                self.handle_game_over_event(event)
             elif self.state == GameState.SETTINGS:
                 settings_action = self.settings_menu.handle_input(event)
                 if settings_action == "mainmenu":
@@ -134,23 +202,27 @@ class TwisterGame:
                 leaderboard_action = self.leaderboard_menu.handle_input(event)
                 if leaderboard_action == "mainmenu":
                     self.state = GameState.MENU
+                elif leaderboard_action == "refresh":
+                    self.leaderboard_menu.fetch_leaderboard()
+                    if self.is_logged_in:
+                        self.leaderboard_menu.fetch_rank(self.username)
             elif self.state == GameState.LOGIN:
-                login_action, username = await self.login_menu.handle_input(event)
-                if login_action == "success":
-                    self.is_logged_in = True
-                    self.username = username
-                    self.state = GameState.MENU
-                elif login_action == "back":
+                if self.login_menu.handle_input(event) == "back":
                     self.state = GameState.MENU
 
         return True
 
+    def logged_in(self, username):
+        self.is_logged_in = True
+        self.username = username
+        if self.state == GameState.LOGIN:
+            self.state = GameState.MENU
+
     def handle_menu_event(self, event):
         action = self.game_menu.handle_input(event)
         if action == "startgame":
             self.logger.info("Starting new game")
-            self.state = GameState.PLAYING
-            self.initialize_game_state()
+            self.start_game()
         elif action == "settings":
             self.logger.info("Entering settings menu")
             self.state = GameState.SETTINGS
@@ -177,6 +249,7 @@ class TwisterGame:
             self.state = GameState.MENU
 
     def update(self):
+        """Advance the simulation by one fixed tick of 1 / TICK_RATE seconds."""
         if self.state == GameState.PLAYING:
             self.update_game()
         elif self.state == GameState.MENU:
@@ -188,14 +261,33 @@ class TwisterGame:
 
     def handle_game_event(self, event):
         if event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_SPACE:
-                self.clockwise = not self.clockwise
+            if event.key == pygame.K_SPACE and not self.playback:
+                self.toggle_direction()
             elif event.key == pygame.K_ESCAPE:
                 self.state = GameState.PAUSED
 
-    async def handle_game_over_event(self, event):
-        if not self.score_submitted:
-            await self.submit_score()
+    def toggle_direction(self):
+        self.clockwise = not self.clockwise
+        self.toggles.append(self.ticks)
+
+    def apply_script(self):
+        while self.next_toggle is not None and self.next_toggle <= self.ticks:
+            self.toggle_direction()
+            self.next_toggle = next(self.script, None)
+
+    def replay(self):
+        return Replay(self.seed, list(self.toggles), self.ticks, self.score)
+
+    def save_replay(self):
+        try:
+            path = save_replay(self.replay())
+            self.logger.info("Saved replay to %s", path)
+        except OSError as e:
+            self.logger.warning("Could not save replay: %s", e)
+
+    def handle_game_over_event(self, event):
+        if not self.score_submitted and not self.playback:
+            self.submit_score()
             self.score_submitted = True
 
         if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:  # Left mouse button
@@ -205,113 +297,201 @@ class TwisterGame:
             self.state = GameState.MENU
             self.score_submitted = False
 
-    async def submit_score(self):
+    def submit_score(self):
         if not self.is_logged_in:
             self.logger.error("Cannot submit score: Not logged in")
             return
 
-        success, message = await server_comm.submit_score(self.score)
-        if success:
-            self.logger.info("Score submitted successfully!")
-            await self.leaderboard_menu.fetch_leaderboard()
+        # Saved to disk first, so the score survives a server outage or a crash
+        self.score_queue.add(self.username, self.score)
+        self.flush_scores()
+
+    def flush_scores(self):
+        if not self.is_logged_in or self.task_scheduler.pending("score_flush"):
+            return
+        # Held until a login replaces the refused token
+        token = server_comm.access_token
+        if token == self.refused_token or not self.score_queue.ready(self.username):
+            return
+        batch = self.score_queue.batch(self.username)
+        scores = [{"score": record["score"], "submission_id": record["submission_id"]} for record in batch]
+        self.task_scheduler.submit(server_comm.submit_scores(scores),
+                                   lambda result: self.scores_flushed(batch, result, token),
+                                   lambda error: self.scores_flushed(batch, (False, str(error), None, None), token),
+                                   key="score_flush")
+
+    def scores_flushed(self, batch, result, token):
+        success, message, status, retry_after = result
+        if status in AUTH_STATUSES:
+            # Not the scores' fault, so they stay queued without backing off
+            self.refused_token = token
+            self.logger.warning("Login no longer accepted (%s), holding queued scores until the next login: %s",
+                                status, message)
+        elif success:
+            self.score_queue.acknowledge(batch)
+            self.logger.info("Submitted %s queued scores", len(batch))
+            self.leaderboard_store.invalidate()
+            self.leaderboard_menu.fetch_leaderboard()
+            self.leaderboard_menu.fetch_rank(self.username)
+        elif is_permanent(status):
+            if self.score_queue.rejected(batch, message):
+                self.logger.error("Server refused score (%s), moved it to %s: %s",
+                                  status, self.score_queue.rejected_path, message)
+            else:
+                self.logger.warning("Server refused %s scores (%s), retrying them one at a time: %s",
+                                    len(batch), status, message)
         else:
-            self.logger.error(f"Failed to submit score: {message}")
+            delay = self.score_queue.failed(retry_after=retry_after)
+            self.logger.warning("Failed to submit scores, retrying in %.1fs: %s", delay, message)
 
     def update_game(self):
+        self.apply_script()
+        self.ticks += 1
+        self.time += 1 / TICK_RATE
         self.player.move(self.clockwise, self.difficulty_multiplier)
+        started = self.profiler.start()
         self.update_dots()
         self.spawn_new_dot()
+        self.profiler.stop("dots", started)
         self.difficulty_multiplier *= DIFFICULTY_INCREASE_RATE
-        self.power_up_manager.update(self.player, self.difficulty_multiplier, 1 / FPS)
-        self.particle_system.update(1 / FPS)
+        started = self.profiler.start()
+        self.power_up_manager.update(self.player, self.difficulty_multiplier, 1 / TICK_RATE)
+        self.profiler.stop("power_ups", started)
+        started = self.profiler.start()
+        self.particle_system.update(1 / TICK_RATE)
+        self.profiler.stop("particles", started)
+        self.twister.update()
+        for particle in self.background_particles:
+            particle.move()
+        started = self.profiler.start()
         self.achievement_manager.update(self)
+        self.profiler.stop("achievements", started)
 
         if self.game_over:
             self.state = GameState.GAME_OVER
             self.sound_manager.play_game_over()
+            if not self.headless and not self.playback:
+                self.save_replay()
 
     def update_dots(self):
-        for dot in self.dots[:]:
-            dot.move(self.difficulty_multiplier)
-            if dot.distance > RING_RADIUS + DOT_RADIUS:
-                self.dots.remove(dot)
-            elif self.player.collides_with(dot):
-                if dot.good:
-                    self.score += int(1 * self.player.get_score_multiplier())
-                    self.player.increase_combo()
-                    self.sound_manager.play_collect()
-                    self.particle_system.create_particles(dot.x, dot.y, GREEN)
-                    self.dots.remove(dot)
-                else:
-                    self.game_over = True
-                    self.particle_system.create_particles(dot.x, dot.y, RED)
+        dots = self.dots
+        dots.move(self.difficulty_multiplier)
+        escaped = dots.beyond(RING_RADIUS + DOT_RADIUS)
+        hit = dots.touching(self.player.x, self.player.y, PLAYER_RADIUS + DOT_RADIUS)
+        if not hit.any():
+            dots.remove(escaped)
+            return
+        hit &= ~escaped
+        good = dots.kind[:len(dots)] == GOOD_DOT
+        # Only dots that reached the player need per-dot work, and they are taken in spawn order
+        for i in np.flatnonzero(hit).tolist():
+            x, y = float(dots.x[i]), float(dots.y[i])
+            if good[i]:
+                self.score += int(1 * self.player.get_score_multiplier())
+                self.player.increase_combo()
+                self.sound_manager.play_collect()
+                self.particle_system.create_particles(x, y, GREEN)
+            else:
+                self.game_over = True
+                self.particle_system.create_particles(x, y, RED)
+        dots.remove(escaped | (hit & good))
 
     def spawn_new_dot(self):
-        self.frames_since_last_spawn += 1
-        if self.frames_since_last_spawn >= DOT_SPAWN_RATE:
-            self.dots.append(Dot())
-            self.frames_since_last_spawn = 0
-
-    def render(self):
-        self.screen.fill(BACKGROUND_COLOR)
+        self.ticks_since_last_spawn += 1
+        if self.ticks_since_last_spawn >= DOT_SPAWN_RATE:
+            angle = self.rng.uniform(0, 2 * math.pi)
+            good = self.rng.choice([True, False])
+            self.dots.spawn(angle, GOOD_DOT if good else BAD_DOT)
+            self.ticks_since_last_spawn = 0
+
+    def render(self, alpha=1.0):
+        started = self.profiler.start()
+        if self.state == GameState.PLAYING:
+            self.renderer.restore()
+            rects = self.render_game(alpha)
+        elif self.redraw_needed or self.state != self.rendered_state or self.profiler.overlay:
+            self.render_screen()
+            rects = None
+        else:
+            # Menus and the pause and game over screens only change on input or a finished request
+            self.profiler.stop("render", started)
+            return
+        self.rendered_state = self.state
+        self.redraw_needed = False
+        self.profiler.stop("render", started)
+
+        overlay_rect = self.profiler.draw(self.screen, self.font_manager.get_font(BASE_FONT_SIZE * 0.7))
+        if rects is not None and overlay_rect:
+            rects.append(overlay_rect)
+        started = self.profiler.start()
+        self.renderer.present(rects)
+        self.profiler.stop("flip", started)
+
+    def render_screen(self):
+        """Redraw everything for the current state."""
+        # Menus cover the whole screen, the pause and game over screens go over the game
+        if self.state in (GameState.GAME_OVER, GameState.PAUSED):
+            self.renderer.draw_background()
+            self.render_game()
         if self.state == GameState.MENU:
             self.game_menu.draw(self.is_logged_in, self.username)
-        elif self.state == GameState.PLAYING:
-            self.render_game()
         elif self.state == GameState.GAME_OVER:
-            self.render_game()
+            text_started = self.profiler.start()
             self.render_game_over()
+            self.profiler.stop("text", text_started)
         elif self.state == GameState.SETTINGS:
             self.settings_menu.draw()
         elif self.state == GameState.PAUSED:
-            self.render_game()
             self.pause_menu.draw(self.screen)
         elif self.state == GameState.LEADERBOARD:
             self.leaderboard_menu.draw()
         elif self.state == GameState.LOGIN:
             self.login_menu.draw()
-        
-        pygame.display.flip()
 
-    def render_game(self):
-        for particle in self.background_particles:
-            particle.move()
-            particle.draw(self.screen)
-        pygame.draw.circle(self.screen, WHITE, (GAME_WIDTH // 2, GAME_HEIGHT // 2), RING_RADIUS, RING_THICKNESS)
-        self.power_up_manager.draw(self.screen)
-        for dot in self.dots:
-            dot.draw(self.screen)
-        self.player.draw(self.screen)
-        self.twister.update()
-        self.twister.draw(self.screen)
-        self.draw_score()
-        self.particle_system.draw(self.screen)
+    def render_game(self, alpha=1.0):
+        """Draw the moving parts of the game over the background and return the rects they cover."""
+        # Moving objects are drawn alpha of the way from their previous tick to the latest one
+        rects = [particle.draw(self.screen) for particle in self.background_particles]
+        started = self.profiler.start()
+        rects += self.power_up_manager.draw(self.screen, alpha)
+        self.profiler.stop("power_ups", started)
+        started = self.profiler.start()
+        rects += self.dots.draw(self.screen, DOT_COLORS, alpha)
+        self.profiler.stop("dots", started)
+        rects.append(self.player.draw(self.screen, alpha))
+        rects.append(self.twister.draw(self.screen))
+        started = self.profiler.start()
+        rects.append(self.draw_score())
+        self.profiler.stop("text", started)
+        started = self.profiler.start()
+        rects += self.particle_system.draw(self.screen)
+        self.profiler.stop("particles", started)
+        return rects
 
     def draw_score(self):
-        font = self.font_manager.get_font(BASE_FONT_SIZE)
-        score_text = font.render(f"Score: {self.score}", True, WHITE)
-        self.screen.blit(score_text, (10, 10))
+        score_text = self.font_manager.render_text(f"Score: {self.score}", BASE_FONT_SIZE, WHITE)
+        return self.screen.blit(score_text, (10, 10))
 
     def render_game_over(self):
         overlay = pygame.Surface((GAME_WIDTH, GAME_HEIGHT), pygame.SRCALPHA)
         overlay.fill((0, 0, 0, 128))  # Semi-transparent black
         self.screen.blit(overlay, (0, 0))
 
-        font = self.font_manager.get_font(BASE_FONT_SIZE * 2)
-        game_over_text = font.render("Game Over", True, RED)
+        game_over_text = self.font_manager.render_text("Game Over", BASE_FONT_SIZE * 2, RED)
         game_over_rect = game_over_text.get_rect(center=(GAME_WIDTH // 2, GAME_HEIGHT // 2 - 50))
         self.screen.blit(game_over_text, game_over_rect)
 
-        font = self.font_manager.get_font(BASE_FONT_SIZE)
-        score_text = font.render(f"Final Score: {self.score}", True, WHITE)
+        score_text = self.font_manager.render_text(f"Final Score: {self.score}", BASE_FONT_SIZE, WHITE)
         score_rect = score_text.get_rect(center=(GAME_WIDTH // 2, GAME_HEIGHT // 2 + 20))
         self.screen.blit(score_text, score_rect)
 
-        instruction_text = font.render("Click or press Enter to return to main menu", True, WHITE)
+        instruction_text = self.font_manager.render_text("Click or press Enter to return to main menu",
+                                                         BASE_FONT_SIZE, WHITE)
         instruction_rect = instruction_text.get_rect(center=(GAME_WIDTH // 2, GAME_HEIGHT // 2 + 70))
         self.screen.blit(instruction_text, instruction_rect)
 
 async def main():
+    setup_logging()
     game = TwisterGame()
     await game.run()
 
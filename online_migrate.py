@@ -0,0 +1,259 @@
+"""Online, resumable schema migrations for the leaderboard's SQLite database.
+
+db_migrate.py recreates every table, and a plain CREATE INDEX or table-wide
+UPDATE holds SQLite's write lock until it finishes. The steps here work in
+bounded batches instead. Each batch runs in its own short write transaction
+and records its progress in the online_migration table in that same
+transaction. An interrupted run resumes from the last committed batch, and
+submit_score writes only wait for one batch at a time.
+
+New indexes are built on a shadow copy of the table. Triggers keep the copy
+in sync with live writes while existing rows are copied over in key order,
+and then the two tables are swapped by rename.
+
+    python online_migrate.py                 # apply pending migrations
+    python online_migrate.py --status        # show progress
+"""
+import argparse
+import logging
+import re
+import sqlite3
+import time
+
+logger = logging.getLogger(__name__)
+
+MIN_KEY = -2 ** 63
+CHECKPOINT_TABLE = "online_migration"
+
+class MigrationError(Exception):
+    pass
+
+def max_key(conn, table, key):
+    return conn.execute(f"SELECT MAX({key}) FROM {table}").fetchone()[0]
+
+def next_key_bound(conn, table, key, start, target, batch_size):
+    """Return the last key of the next batch after start, or None when done."""
+    if target is None:
+        return None
+    return conn.execute(
+        f"SELECT MAX({key}) FROM (SELECT {key} FROM {table} WHERE {key} > ? AND {key} <= ? ORDER BY {key} LIMIT ?)",
+        (start, target, batch_size)
+    ).fetchone()[0]
+
+class AddColumn:
+    """Add a nullable column. SQLite only rewrites the schema, so this is one
+    short transaction whatever the table size."""
+
+    def __init__(self, name, table, column, definition):
+        self.name = name
+        self.table = table
+        self.column = column
+        self.definition = definition
+
+    def run(self, conn, position, target, batch_size):
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({self.table})")}
+        if self.column not in columns:
+            conn.execute(f"ALTER TABLE {self.table} ADD COLUMN {self.column} {self.definition}")
+        return None, None, True
+
+    def describe(self, position, target):
+        return ""
+
+class Backfill:
+    """Run statement over successive key ranges of table.
+
+    statement receives :start and :end and must be idempotent for a range.
+    Only keys that existed when the backfill started are visited, so live
+    writes must already keep rows added later up to date.
+    """
+
+    def __init__(self, name, table, statement, key="id"):
+        self.name = name
+        self.table = table
+        self.statement = statement
+        self.key = key
+
+    def run(self, conn, position, target, batch_size):
+        if position is None:
+            return MIN_KEY, max_key(conn, self.table, self.key), False
+        end = next_key_bound(conn, self.table, self.key, position, target, batch_size)
+        if end is None:
+            return position, target, True
+        conn.execute(self.statement, {"start": position, "end": end})
+        return end, target, False
+
+    def describe(self, position, target):
+        return f"{self.key} {position} of {target}"
+
+class BuildIndexes:
+    """Add indexes to table through a trigger-synced shadow copy.
+
+    indexes maps index names to CREATE INDEX statements with a {table}
+    placeholder. The table's key must be its INTEGER PRIMARY KEY. Rows
+    inserted after the shadow is created reach it through the triggers, so
+    the copy stops at the largest key that existed then.
+    """
+
+    def __init__(self, name, table, indexes, key="id"):
+        self.name = name
+        self.table = table
+        self.indexes = indexes
+        self.key = key
+        self.shadow = f"{table}__shadow"
+
+    def index_exists(self, conn, index):
+        return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (index,)).fetchone()
+
+    def trigger_names(self):
+        return [f"{self.shadow}_{event}" for event in ("insert", "update", "delete")]
+
+    def create_shadow(self, conn):
+        explicit = conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ? "
+                                "AND sql IS NOT NULL", (self.table,)).fetchall()
+        if explicit:
+            # Index names are global in SQLite, so they can't be recreated on the shadow
+            raise MigrationError(f"{self.table} already has indexes {[row[0] for row in explicit]}; "
+                                 "drop them or build the new ones in a separate table")
+        table_sql = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                 (self.table,)).fetchone()[0]
+        shadow_sql, found = re.subn(rf'^CREATE TABLE\s+(["`]?){self.table}\1', f"CREATE TABLE {self.shadow}",
+                                    table_sql, count=1)
+        if not found:
+            raise MigrationError(f"Unexpected schema for {self.table}: {table_sql}")
+        conn.execute(shadow_sql)
+        for index_sql in self.indexes.values():
+            conn.execute(index_sql.format(table=self.shadow))
+
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({self.table})")]
+        column_list = ", ".join(columns)
+        new_values = ", ".join(f"NEW.{column}" for column in columns)
+        copy_new = f"INSERT OR REPLACE INTO {self.shadow} ({column_list}) VALUES ({new_values});"
+        remove_old = f"DELETE FROM {self.shadow} WHERE {self.key} = OLD.{self.key};"
+        insert_trigger, update_trigger, delete_trigger = self.trigger_names()
+        conn.execute(f"CREATE TRIGGER {insert_trigger} AFTER INSERT ON {self.table} BEGIN {copy_new} END")
+        conn.execute(f"CREATE TRIGGER {update_trigger} AFTER UPDATE ON {self.table} BEGIN {remove_old} {copy_new} END")
+        conn.execute(f"CREATE TRIGGER {delete_trigger} AFTER DELETE ON {self.table} BEGIN {remove_old} END")
+
+    def swap(self, conn):
+        for trigger in self.trigger_names():
+            conn.execute(f"DROP TRIGGER {trigger}")
+        conn.execute(f"ALTER TABLE {self.table} RENAME TO {self.table}__old")
+        conn.execute(f"ALTER TABLE {self.shadow} RENAME TO {self.table}")
+        conn.execute(f"DROP TABLE {self.table}__old")
+
+    def run(self, conn, position, target, batch_size):
+        if position is None:
+            if all(self.index_exists(conn, index) for index in self.indexes):
+                return None, None, True
+            self.create_shadow(conn)
+            return MIN_KEY, max_key(conn, self.table, self.key), False
+        end = next_key_bound(conn, self.table, self.key, position, target, batch_size)
+        if end is None:
+            self.swap(conn)
+            return position, target, True
+        # Rows already written by the triggers are newer than this copy
+        conn.execute(f"INSERT OR IGNORE INTO {self.shadow} SELECT * FROM {self.table} "
+                     f"WHERE {self.key} > ? AND {self.key} <= ?", (position, end))
+        return end, target, False
+
+    def describe(self, position, target):
+        return f"copied {self.key} {position} of {target}"
+
+def connect(database_path, busy_timeout=30):
+    # Autocommit mode, so BEGIN IMMEDIATE and DDL are under our control
+    return sqlite3.connect(database_path, timeout=busy_timeout, isolation_level=None)
+
+def ensure_checkpoints(conn):
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {CHECKPOINT_TABLE} (name TEXT PRIMARY KEY, position INTEGER, "
+                 "target INTEGER, done INTEGER NOT NULL DEFAULT 0, updated_at TEXT)")
+
+def load_checkpoint(conn, name):
+    """Return (position, target, done) for a migration."""
+    row = conn.execute(f"SELECT position, target, done FROM {CHECKPOINT_TABLE} WHERE name = ?", (name,)).fetchone()
+    return (row[0], row[1], bool(row[2])) if row else (None, None, False)
+
+def save_checkpoint(conn, name, position, target, done):
+    conn.execute(f"INSERT INTO {CHECKPOINT_TABLE} (name, position, target, done, updated_at) "
+                 "VALUES (?, ?, ?, ?, datetime('now')) ON CONFLICT(name) DO UPDATE SET "
+                 "position = excluded.position, target = excluded.target, done = excluded.done, "
+                 "updated_at = excluded.updated_at",
+                 (name, position, target, int(done)))
+
+def run_batch(conn, migration, batch_size):
+    """Run one batch and its checkpoint in a single write transaction."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Re-read inside the lock so concurrent runners never repeat a batch
+        position, target, done = load_checkpoint(conn, migration.name)
+        if not done:
+            position, target, done = migration.run(conn, position, target, batch_size)
+            save_checkpoint(conn, migration.name, position, target, done)
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return position, target, done
+
+def run_migrations(database_path, migrations, batch_size=500, pause=0.01, progress_interval=5.0):
+    """Apply pending migrations in order, sleeping pause seconds between batches."""
+    conn = connect(database_path)
+    try:
+        ensure_checkpoints(conn)
+        for migration in migrations:
+            if load_checkpoint(conn, migration.name)[2]:
+                continue
+            logger.info("Running migration %s", migration.name)
+            batches = 0
+            started = last_report = time.monotonic()
+            while True:
+                position, target, done = run_batch(conn, migration, batch_size)
+                batches += 1
+                if done:
+                    break
+                if time.monotonic() - last_report >= progress_interval:
+                    last_report = time.monotonic()
+                    logger.info("Migration %s: %s", migration.name, migration.describe(position, target))
+                time.sleep(pause)
+            logger.info("Migration %s finished in %s batches, %.1fs", migration.name, batches,
+                        time.monotonic() - started)
+    finally:
+        conn.close()
+
+def migration_status(database_path, migrations):
+    conn = connect(database_path)
+    try:
+        ensure_checkpoints(conn)
+        for migration in migrations:
+            position, target, done = load_checkpoint(conn, migration.name)
+            if done:
+                state = "done"
+            elif position is None:
+                state = "pending"
+            else:
+                state = f"in progress, {migration.describe(position, target)}"
+            yield migration.name, state
+    finally:
+        conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=500, help="rows per write transaction")
+    parser.add_argument("--pause", type=float, default=0.01, help="seconds to yield to other writers between batches")
+    parser.add_argument("--status", action="store_true", help="show progress without migrating")
+    args = parser.parse_args()
+
+    from log_setup import setup_logging
+    import leaderboard_server as server
+
+    setup_logging({"online_migrate": "INFO"})
+    database_path = server.database_path()
+    if args.status:
+        for name, state in migration_status(database_path, server.MIGRATIONS):
+            print(f"{name:<28}{state}")
+        return
+    with server.app.app_context():
+        server.db.create_all()
+    run_migrations(database_path, server.MIGRATIONS, args.batch_size, args.pause)
+
+if __name__ == "__main__":
+    main()
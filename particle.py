@@ -1,40 +1,118 @@
-import pygame
 import random
 import math
+import numpy as np
+import pygame
 
-class Particle:
-    def __init__(self, x, y, color):
-        self.x = x
-        self.y = y
-        self.color = color
-        self.radius = random.randint(2, 5)
-        self.speed = random.uniform(1, 3)
-        self.angle = random.uniform(0, 2 * math.pi)
-        self.lifetime = random.uniform(0.5, 1.5)
+class ParticleSystem:
+    """Fixed-capacity particle buffer kept in NumPy arrays.
 
-    def update(self, dt):
-        self.x += math.cos(self.angle) * self.speed * dt
-        self.y += math.sin(self.angle) * self.speed * dt
-        self.lifetime -= dt
-        self.radius = max(0, self.radius - dt)
+    Live particles occupy the first count slots in no particular order.
+    Expired ones are replaced by live particles from the end of the buffer
+    (swap-remove), so only the removed slots are touched. When a burst
+    doesn't fit, the oldest particles are overwritten. Each particle is
+    drawn by blitting a pre-rasterized circle for its colour and radius,
+    all in one Surface.blits call.
+    """
 
-    def draw(self, screen):
-        pygame.draw.circle(screen, self.color, (int(self.x), int(self.y)), int(self.radius))
+    def __init__(self, rng=random, capacity=512):
+        self.rng = rng
+        self.capacity = capacity
+        self.count = 0
+        self.x = np.empty(capacity)
+        self.y = np.empty(capacity)
+        self.vx = np.empty(capacity)
+        self.vy = np.empty(capacity)
+        self.radius = np.empty(capacity)
+        self.lifetime = np.empty(capacity)
+        self.color = np.empty(capacity, dtype=np.int16)
+        self.serial = np.empty(capacity, dtype=np.int64)  # Creation order, to find the oldest
+        self.next_serial = 0
+        self.colors = []
+        self.color_index = {}
+        self.stamps = {}
 
-class ParticleSystem:
-    def __init__(self):
-        self.particles = []
+    def __len__(self):
+        return self.count
 
     def create_particles(self, x, y, color, count=10):
+        color = tuple(color)
+        if color not in self.color_index:
+            self.color_index[color] = len(self.colors)
+            self.colors.append(color)
+        rng = self.rng
+        values = []
         for _ in range(count):
-            self.particles.append(Particle(x, y, color))
+            radius = rng.randint(2, 5)
+            speed = rng.uniform(1, 3)
+            angle = rng.uniform(0, 2 * math.pi)
+            values.append((math.cos(angle) * speed, math.sin(angle) * speed, radius, rng.uniform(0.5, 1.5)))
+        values = values[-self.capacity:]
+        slots = self.allocate(len(values))
+        vx, vy, radius, lifetime = zip(*values)
+        self.x[slots] = x
+        self.y[slots] = y
+        self.vx[slots] = vx
+        self.vy[slots] = vy
+        self.radius[slots] = radius
+        self.lifetime[slots] = lifetime
+        self.color[slots] = self.color_index[color]
+        self.serial[slots] = np.arange(self.next_serial, self.next_serial + len(values))
+        self.next_serial += len(values)
+
+    def allocate(self, count):
+        """Return slots for count new particles, overwriting the oldest if the buffer is full."""
+        live = self.count
+        free = min(count, self.capacity - live)
+        slots = np.arange(live, live + free)
+        overwrite = count - free
+        if overwrite:
+            oldest = np.argpartition(self.serial[:live], overwrite - 1)[:overwrite]
+            slots = np.concatenate((slots, oldest))
+        self.count = live + free
+        return slots
 
     def update(self, dt):
-        for particle in self.particles[:]:
-            particle.update(dt)
-            if particle.lifetime <= 0:
-                self.particles.remove(particle)
+        n = self.count
+        if not n:
+            return
+        self.x[:n] += self.vx[:n] * dt
+        self.y[:n] += self.vy[:n] * dt
+        self.lifetime[:n] -= dt
+        radius = self.radius[:n]
+        radius -= dt
+        np.maximum(radius, 0, out=radius)
+        expired = self.lifetime[:n] <= 0
+        if expired.any():
+            self.swap_remove(expired)
+
+    def swap_remove(self, expired):
+        n = self.count
+        remaining = n - int(np.count_nonzero(expired))
+        # Expired slots below remaining are filled from live particles above it
+        holes = np.flatnonzero(expired[:remaining])
+        movers = np.flatnonzero(~expired[remaining:]) + remaining
+        for array in (self.x, self.y, self.vx, self.vy, self.radius, self.lifetime, self.color, self.serial):
+            array[holes] = array[movers]
+        self.count = remaining
+
+    def stamp(self, color, radius):
+        key = (color, radius)
+        surface = self.stamps.get(key)
+        if surface is None:
+            surface = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+            pygame.draw.circle(surface, self.colors[color], (radius, radius), radius)
+            self.stamps[key] = surface
+        return surface
 
     def draw(self, screen):
-        for particle in self.particles:
-            particle.draw(screen)
\ No newline at end of file
+        n = self.count
+        radii = self.radius[:n].astype(int)
+        visible = np.flatnonzero(radii > 0)
+        if not len(visible):
+            return []
+        radii = radii[visible].tolist()
+        xs = self.x[visible].astype(int).tolist()
+        ys = self.y[visible].astype(int).tolist()
+        colors = self.color[visible].tolist()
+        return screen.blits([(self.stamp(color, radius), (x - radius, y - radius))
+                             for x, y, radius, color in zip(xs, ys, radii, colors)])
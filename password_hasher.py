@@ -0,0 +1,62 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+def available_cores():
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+class HasherBusy(Exception):
+    def __init__(self, retry_after):
+        super().__init__("Password hashing queue is full")
+        self.retry_after = retry_after
+
+class PasswordHasher:
+    """Runs password hashing in a process pool with bounded admission.
+
+    At most workers + queue_size hashes are in flight; beyond that submit()
+    raises HasherBusy straight away so callers can shed load instead of
+    tying up request threads behind a login burst.
+    """
+
+    def __init__(self, workers=None, queue_size=64, retry_after=1):
+        self.workers = workers or available_cores()
+        self.slots = threading.BoundedSemaphore(self.workers + queue_size)
+        self.retry_after = retry_after
+        self.executor = None
+        self.lock = threading.Lock()
+
+    def get_executor(self):
+        with self.lock:
+            if self.executor is None:
+                # Forking a server that already runs threads can copy held locks
+                method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                self.executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context(method))
+            return self.executor
+
+    def submit(self, function, *args):
+        if not self.slots.acquire(blocking=False):
+            raise HasherBusy(self.retry_after)
+        try:
+            future = self.get_executor().submit(function, *args)
+        except Exception:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+    def hash(self, password):
+        return self.submit(generate_password_hash, password)
+
+    def check(self, password_hash, password):
+        return self.submit(check_password_hash, password_hash, password)
+
+    def shutdown(self):
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown()
+                self.executor = None
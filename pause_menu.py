@@ -1,9 +1,10 @@
 import pygame
 from game_settings import *
+from retained_menu import RetainedMenu
 
-class PauseMenu:
+class PauseMenu(RetainedMenu):
     def __init__(self, screen, sound_manager, font_manager):
-        self.screen = screen
+        super().__init__(screen, transparent=True)
         self.sound_manager = sound_manager
         self.font_manager = font_manager
         self.menu_items = ["Resume", "Settings", "Quit to Main Menu"]
@@ -39,33 +40,31 @@ class PauseMenu:
                     break
         return None
 
-    def draw(self, game_surface):
-        # Create a semi-transparent overlay
-        overlay = pygame.Surface((GAME_WIDTH, GAME_HEIGHT), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 128))  # Semi-transparent black
-        game_surface.blit(overlay, (0, 0))
+    def view_state(self):
+        return self.selected_item, self.hovered_item
 
-        font = self.font_manager.get_font(BASE_FONT_SIZE * 2)
-        title = font.render("Paused", True, WHITE)
+    def compose(self, surface):
+        surface.fill((0, 0, 0, 128))  # Semi-transparent black, over the paused game
+
+        title = self.font_manager.render_text("Paused", BASE_FONT_SIZE * 2, WHITE)
         title_rect = title.get_rect(center=(GAME_WIDTH // 2, GAME_HEIGHT // 4))
-        game_surface.blit(title, title_rect)
+        surface.blit(title, title_rect)
 
-        font = self.font_manager.get_font(BASE_FONT_SIZE)
         self.item_rects = []
         for i, item in enumerate(self.menu_items):
             color = ORANGE if i == self.selected_item or i == self.hovered_item else WHITE
-            text = font.render(item, True, color)
+            text = self.font_manager.render_text(item, BASE_FONT_SIZE, color)
             text_rect = text.get_rect(center=(GAME_WIDTH // 2, GAME_HEIGHT // 2 + i * 50))
-            game_surface.blit(text, text_rect)
+            surface.blit(text, text_rect)
             self.item_rects.append(text_rect)
 
         # Draw a rectangle around the selected or hovered item
         if self.hovered_item != -1:
-            pygame.draw.rect(game_surface, ORANGE, self.item_rects[self.hovered_item], 2)
+            pygame.draw.rect(surface, ORANGE, self.item_rects[self.hovered_item], 2)
         elif self.selected_item != -1:
-            pygame.draw.rect(game_surface, ORANGE, self.item_rects[self.selected_item], 2)
+            pygame.draw.rect(surface, ORANGE, self.item_rects[self.selected_item], 2)
 
         # Add instruction for ESC key
-        esc_text = font.render("Press ESC to resume", True, WHITE)
+        esc_text = self.font_manager.render_text("Press ESC to resume", BASE_FONT_SIZE, WHITE)
         esc_rect = esc_text.get_rect(center=(GAME_WIDTH // 2, GAME_HEIGHT - 50))
-        game_surface.blit(esc_text, esc_rect)
\ No newline at end of file
+        surface.blit(esc_text, esc_rect)
\ No newline at end of file
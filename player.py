@@ -3,11 +3,14 @@ import math
 from game_settings import *
 
 class Player:
-    def __init__(self):
+    def __init__(self, headless=False):
         self.angle = 0
         self.update_position()
-        self.image = pygame.image.load('Player.png').convert_alpha()
-        self.image = pygame.transform.scale(self.image, (PLAYER_RADIUS*2.3, PLAYER_RADIUS*2.3))
+        self.previous_x, self.previous_y = self.x, self.y
+        self.image = None
+        if not headless:
+            self.image = pygame.image.load('Player.png').convert_alpha()
+            self.image = pygame.transform.scale(self.image, (PLAYER_RADIUS*2.3, PLAYER_RADIUS*2.3))
         self.combo = 0
         self.combo_timer = 0
         self.score_multiplier = 1
@@ -19,6 +22,7 @@ class Player:
         self.y = GAME_HEIGHT // 2 + math.sin(self.angle) * RING_RADIUS    
 
     def move(self, clockwise, difficulty_multiplier):
+        self.previous_x, self.previous_y = self.x, self.y
         speed = PLAYER_SPEED * difficulty_multiplier * self.speed_multiplier
         if clockwise:
             self.angle += speed / RING_RADIUS
@@ -26,9 +30,12 @@ class Player:
             self.angle -= speed / RING_RADIUS
         self.update_position()
 
-    def draw(self, screen):
-        image_rect = self.image.get_rect(center=(int(self.x), int(self.y)))
-        screen.blit(self.image, image_rect)
+    def draw(self, screen, alpha=1.0):
+        # Interpolating x and y, not the angle, cuts the corner by well under a pixel per tick
+        x = self.previous_x + (self.x - self.previous_x) * alpha
+        y = self.previous_y + (self.y - self.previous_y) * alpha
+        image_rect = self.image.get_rect(center=(int(x), int(y)))
+        return screen.blit(self.image, image_rect)
 
     def collides_with(self, dot):
         return math.hypot(dot.x - self.x, dot.y - self.y) < PLAYER_RADIUS + DOT_RADIUS
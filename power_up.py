@@ -1,73 +1,62 @@
-import pygame
 import random
 import math
+import numpy as np
 from game_settings import *
+from dot_field import DotField
 
-class PowerUp:
-    def __init__(self):
-        self.angle = random.uniform(0, 2 * math.pi)
-        self.distance = 50
-        self.type = random.choice(["speed", "score", "invincibility"])
-        self.update_position()
-        self.duration = 5  # seconds
-
-    def update_position(self):
-        self.x = GAME_WIDTH // 2 + math.cos(self.angle) * self.distance
-        self.y = GAME_HEIGHT // 2 + math.sin(self.angle) * self.distance
-
-    def move(self, difficulty_multiplier):
-        speed = PLAYER_SPEED * difficulty_multiplier
-        self.angle += 0.02 * difficulty_multiplier
-        self.distance += speed * 1.2
-        self.update_position()
-
-    def draw(self, screen):
-        color = BLUE if self.type == "speed" else PURPLE if self.type == "score" else ORANGE
-        pygame.draw.circle(screen, color, (int(self.x), int(self.y)), DOT_RADIUS)
+POWER_UP_TYPES = ("speed", "score", "invincibility")
+POWER_UP_COLORS = (BLUE, PURPLE, ORANGE)
+POWER_UP_DURATION = 5  # seconds
 
 class PowerUpManager:
-    def __init__(self):
-        self.power_ups = []
-        self.active_power_up = None
+    def __init__(self, rng=random):
+        self.rng = rng
+        self.power_ups = DotField(capacity=8)
+        self.active_power_up = None  # Type of the active power-up
         self.active_time = 0
 
     def spawn_power_up(self):
-        if random.random() < 0.02:  # 2% chance to spawn a power-up each frame
-            self.power_ups.append(PowerUp())
+        if self.rng.random() < 0.02:  # 2% chance to spawn a power-up each tick
+            angle = self.rng.uniform(0, 2 * math.pi)
+            power_type = self.rng.choice(POWER_UP_TYPES)
+            self.power_ups.spawn(angle, POWER_UP_TYPES.index(power_type))
 
     def update(self, player, difficulty_multiplier, dt):
         self.spawn_power_up()
-        
-        for power_up in self.power_ups[:]:
-            power_up.move(difficulty_multiplier)
-            if player.collides_with(power_up):
-                self.activate_power_up(power_up, player)
-                self.power_ups.remove(power_up)
+
+        power_ups = self.power_ups
+        if len(power_ups):
+            power_ups.move(difficulty_multiplier)
+            collected = power_ups.touching(player.x, player.y, PLAYER_RADIUS + DOT_RADIUS)
+            if collected.any():
+                for i in np.flatnonzero(collected).tolist():
+                    self.activate_power_up(POWER_UP_TYPES[power_ups.kind[i]], player)
+            # Past this distance a power-up can never reach the player again
+            power_ups.remove(collected | power_ups.beyond(RING_RADIUS + PLAYER_RADIUS + DOT_RADIUS))
 
         if self.active_power_up:
             self.active_time += dt
-            if self.active_time >= self.active_power_up.duration:
+            if self.active_time >= POWER_UP_DURATION:
                 self.deactivate_power_up(player)
 
-    def activate_power_up(self, power_up, player):
-        self.active_power_up = power_up
+    def activate_power_up(self, power_type, player):
+        self.active_power_up = power_type
         self.active_time = 0
-        if power_up.type == "speed":
+        if power_type == "speed":
             player.speed_multiplier = 2
-        elif power_up.type == "score":
+        elif power_type == "score":
             player.score_multiplier = 2
-        elif power_up.type == "invincibility":
+        elif power_type == "invincibility":
             player.invincible = True
 
     def deactivate_power_up(self, player):
-        if self.active_power_up.type == "speed":
+        if self.active_power_up == "speed":
             player.speed_multiplier = 1
-        elif self.active_power_up.type == "score":
+        elif self.active_power_up == "score":
             player.score_multiplier = 1
-        elif self.active_power_up.type == "invincibility":
+        elif self.active_power_up == "invincibility":
             player.invincible = False
         self.active_power_up = None
 
-    def draw(self, screen):
-        for power_up in self.power_ups:
-            power_up.draw(screen)
\ No newline at end of file
+    def draw(self, screen, alpha=1.0):
+        return self.power_ups.draw(screen, POWER_UP_COLORS, alpha)
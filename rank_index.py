@@ -0,0 +1,101 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+class RankIndex:
+    """Order-statistics index over users' best scores.
+
+    A Fenwick tree keyed by score value holds how many users have each best
+    score, so ranks and "who is at position N" are O(log max_score) no matter
+    how many users there are. The tree is as long as the highest score, so
+    key() indexes negative scores as 0 and scores above max_score as
+    max_score: they share a rank with the other scores at that end.
+    """
+
+    def __init__(self, capacity=1024, max_score=None):
+        self.lock = threading.RLock()
+        self.max_score = max_score
+        self.loaded = False
+        self.clear(capacity)
+
+    def clear(self, capacity=1024):
+        with self.lock:
+            self.size = 1
+            while self.size < capacity:
+                self.size *= 2
+            self.tree = [0] * (self.size + 1)
+            self.total = 0
+
+    def key(self, score):
+        score = max(score, 0)
+        return score if self.max_score is None else min(score, self.max_score)
+
+    def load(self, score_counts):
+        with self.lock:
+            self.clear()
+            clamped = 0
+            for score, count in score_counts:
+                if self.max_score is not None and score > self.max_score:
+                    clamped += count
+                self.add(score, count)
+            if clamped:
+                # Stored before submissions were capped
+                logger.warning("Ranking %s scores above %s as %s", clamped, self.max_score, self.max_score)
+            self.loaded = True
+
+    def grow(self, score):
+        # Doubling a power-of-two Fenwick tree only adds one non-empty node:
+        # the new root, which covers everything indexed so far.
+        while score >= self.size:
+            self.tree.extend([0] * self.size)
+            self.size *= 2
+            self.tree[self.size] = self.total
+
+    def add(self, score, delta=1):
+        score = self.key(score)
+        with self.lock:
+            self.grow(score)
+            i = score + 1
+            while i <= self.size:
+                self.tree[i] += delta
+                i += i & -i
+            self.total += delta
+
+    def move(self, old_score, new_score):
+        with self.lock:
+            if old_score is not None:
+                self.add(old_score, -1)
+            self.add(new_score, 1)
+
+    def count_at_or_below(self, score):
+        i = min(self.key(score) + 1, self.size)
+        count = 0
+        while i > 0:
+            count += self.tree[i]
+            i -= i & -i
+        return count
+
+    def count_above(self, score):
+        with self.lock:
+            return self.total - self.count_at_or_below(score)
+
+    def rank(self, score):
+        # Competition ranking: tied scores share a rank
+        return self.count_above(score) + 1
+
+    def score_at(self, position):
+        """Return the score held at 0-based position in descending order."""
+        with self.lock:
+            if not 0 <= position < self.total:
+                return None
+            # Smallest score whose ascending prefix count exceeds this position
+            target = self.total - position
+            i = 0
+            step = self.size
+            while step:
+                if i + step <= self.size and self.tree[i + step] < target:
+                    i += step
+                    target -= self.tree[i]
+                step //= 2
+            return i
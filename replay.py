@@ -0,0 +1,142 @@
+"""Record, store and replay TwisterGame runs.
+
+A game is fully determined by its seed and the simulation ticks at which
+the player flipped direction, so that is all a replay stores, together
+with the final tick and score to check a re-simulation against. Files are
+a 5-byte header followed by unsigned LEB128 varints: seed, final tick,
+score, toggle count, then each toggle as the tick delta from the previous
+one. A typical replay is a few dozen bytes.
+
+    python replay.py replays/20240101-120000-42-9f3a.twr  # watch a replay
+    python replay.py --verify replays/*.twr              # re-simulate and check
+"""
+import argparse
+import asyncio
+import os
+import time
+
+MAGIC = b"TWRP"
+VERSION = 1
+REPLAY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "replays")
+
+class ReplayError(Exception):
+    pass
+
+def write_varint(out, value):
+    if value < 0:
+        raise ReplayError(f"Cannot store negative value {value}")
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return
+
+def read_varint(data, offset):
+    value = 0
+    shift = 0
+    while True:
+        if offset >= len(data):
+            raise ReplayError("Replay is truncated")
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, offset
+        shift += 7
+
+class Replay:
+    def __init__(self, seed, toggles, ticks, score):
+        self.seed = seed
+        self.toggles = toggles
+        self.ticks = ticks
+        self.score = score
+
+    def to_bytes(self):
+        out = bytearray(MAGIC)
+        out.append(VERSION)
+        for value in (self.seed, self.ticks, self.score, len(self.toggles)):
+            write_varint(out, value)
+        previous = 0
+        for tick in self.toggles:
+            write_varint(out, tick - previous)
+            previous = tick
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if data[:len(MAGIC)] != MAGIC:
+            raise ReplayError("Not a replay file")
+        if len(data) == len(MAGIC):
+            raise ReplayError("Replay is truncated")
+        if data[len(MAGIC)] != VERSION:
+            raise ReplayError(f"Unsupported replay version {data[len(MAGIC)]}")
+        offset = len(MAGIC) + 1
+        header = []
+        for _ in range(4):
+            value, offset = read_varint(data, offset)
+            header.append(value)
+        seed, ticks, score, count = header
+        toggles = []
+        tick = 0
+        for _ in range(count):
+            delta, offset = read_varint(data, offset)
+            tick += delta
+            toggles.append(tick)
+        return cls(seed, toggles, ticks, score)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+def save_replay(replay, directory=REPLAY_DIR):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{replay.score}-{replay.seed:x}.twr")
+    replay.save(path)
+    return path
+
+def verify(replay):
+    """Fast-forward the replay headlessly and check it reaches the recorded result."""
+    from headless import simulate
+
+    result = simulate(replay.seed, replay.toggles, max_ticks=replay.ticks)
+    return result['ticks'] == replay.ticks and result['score'] == replay.score, result
+
+def watch(replay):
+    from log_setup import setup_logging
+    from main import TwisterGame
+
+    setup_logging()
+    game = TwisterGame()
+    game.start_game(replay.seed, replay.toggles)
+    asyncio.run(game.run())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="replay files")
+    parser.add_argument("--verify", action="store_true", help="re-simulate without a display instead of watching")
+    args = parser.parse_args()
+
+    if not args.verify:
+        watch(Replay.load(args.paths[0]))
+        return
+    failures = 0
+    for path in args.paths:
+        replay = Replay.load(path)
+        started = time.perf_counter()
+        ok, result = verify(replay)
+        elapsed = (time.perf_counter() - started) * 1000
+        failures += not ok
+        print(f"{path}: {'ok' if ok else 'MISMATCH'} score {result['score']}/{replay.score}, "
+              f"tick {result['ticks']}/{replay.ticks}, {os.path.getsize(path)} bytes, {elapsed:.1f}ms")
+    raise SystemExit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
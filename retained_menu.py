@@ -0,0 +1,33 @@
+import pygame
+
+class RetainedMenu:
+    """Base for menus that keep their last drawing on a surface of their own.
+
+    Subclasses draw all their widgets in compose(surface) and return from
+    view_state() everything compose reads, as a tuple. draw() composes again
+    only when that tuple changes, and otherwise just blits the cached surface.
+    """
+
+    def __init__(self, screen, transparent=False):
+        self.screen = screen
+        self.transparent = transparent
+        self.surface = None
+        self.composed_state = None
+
+    def view_state(self):
+        raise NotImplementedError
+
+    def compose(self, surface):
+        raise NotImplementedError
+
+    def invalidate(self):
+        self.composed_state = None
+
+    def draw(self, target=None):
+        state = self.view_state()
+        if self.surface is None or state != self.composed_state:
+            if self.surface is None:
+                self.surface = pygame.Surface(self.screen.get_size(), pygame.SRCALPHA if self.transparent else 0)
+            self.compose(self.surface)
+            self.composed_state = state
+        (target or self.screen).blit(self.surface, (0, 0))
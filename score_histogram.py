@@ -0,0 +1,66 @@
+import threading
+
+class ScoreHistogram:
+    """Fixed-width buckets counting players by their best score.
+
+    Percentiles are answered from the bucket counts alone, interpolating
+    linearly inside the bucket the score falls in, so the cost depends on
+    the number of buckets rather than players. Negative scores count
+    towards the first bucket.
+    """
+
+    def __init__(self, width=10):
+        self.lock = threading.Lock()
+        self.width = width
+        self.counts = {}
+        self.total = 0
+        self.loaded = False
+
+    def bucket(self, score):
+        return max(score, 0) // self.width
+
+    def deltas(self, changes):
+        """Per-bucket count changes for (old, new) best score transitions."""
+        deltas = {}
+        for old_score, new_score in changes:
+            if old_score is not None:
+                old_bucket = self.bucket(old_score)
+                deltas[old_bucket] = deltas.get(old_bucket, 0) - 1
+            new_bucket = self.bucket(new_score)
+            deltas[new_bucket] = deltas.get(new_bucket, 0) + 1
+        return {bucket: delta for bucket, delta in deltas.items() if delta}
+
+    def load(self, bucket_counts):
+        with self.lock:
+            self.counts = {bucket: count for bucket, count in bucket_counts if count}
+            self.total = sum(self.counts.values())
+            self.loaded = True
+
+    def apply(self, deltas):
+        with self.lock:
+            for bucket, delta in deltas.items():
+                count = self.counts.get(bucket, 0) + delta
+                if count:
+                    self.counts[bucket] = count
+                else:
+                    self.counts.pop(bucket, None)
+                self.total += delta
+
+    def percentile(self, score):
+        """Percentage of players whose best score is below score."""
+        with self.lock:
+            if not self.total:
+                return 0.0
+            position = max(score, 0) / self.width
+            below = 0
+            for bucket, count in self.counts.items():
+                if bucket + 1 <= position:
+                    below += count
+                elif bucket < position:
+                    below += count * (position - bucket)
+            return 100 * below / self.total
+
+    def buckets(self):
+        with self.lock:
+            return [{'min': bucket * self.width, 'max': (bucket + 1) * self.width - 1, 'count': count}
+                    for bucket, count in sorted(self.counts.items())]
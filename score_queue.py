@@ -0,0 +1,125 @@
+import json
+import logging
+import os
+import random
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+QUEUE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pending_scores.jsonl")
+REJECTED_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rejected_scores.jsonl")
+# 4xx responses that say nothing about the scores themselves. A timeout or
+# throttling is retried on backoff; an expired or bad token (401, or 422
+# from flask_jwt_extended) waits for the next login. Any other 4xx is final.
+RETRYABLE_STATUSES = {408, 429}
+AUTH_STATUSES = {401, 422}
+
+def is_permanent(status):
+    """Whether an upload that got this HTTP status (None for no response) must not be retried."""
+    return (status is not None and 400 <= status < 500
+            and status not in RETRYABLE_STATUSES and status not in AUTH_STATUSES)
+
+class ScoreQueue:
+    """Scores waiting to be uploaded, kept in an append-only file.
+
+    Each score is written with a random submission id before any network
+    call, and a later line acknowledges it once the server has stored it.
+    The server ignores ids it has already seen, so a batch that was stored
+    but never acknowledged can be sent again safely. Failed uploads back off
+    exponentially with full jitter, so clients don't retry in lockstep
+    after an outage. Scores the server refuses outright are moved to a
+    separate file instead, so they don't hold up the ones queued after them.
+    """
+
+    def __init__(self, path=QUEUE_FILE, batch_size=50, base_delay=2.0, max_delay=300.0, rejected_path=REJECTED_FILE):
+        self.path = path
+        self.rejected_path = rejected_path
+        self.batch_size = batch_size
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.pending = {}  # submission id -> entry, in the order they were queued
+        self.failures = 0
+        self.next_attempt = 0.0
+        self.suspects = set()  # Ids from a refused batch, retried one at a time
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Torn final write from a crash
+                if "ack" in record:
+                    self.pending.pop(record["ack"], None)
+                else:
+                    self.pending[record["submission_id"]] = record
+        logger.info("Loaded %s unsent scores", len(self.pending))
+        self.compact()
+
+    def append(self, records, path=None):
+        with open(path or self.path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def compact(self):
+        """Rewrite the file with only unacknowledged scores."""
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            for record in self.pending.values():
+                f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+
+    def add(self, username, score):
+        record = {"submission_id": uuid.uuid4().hex, "username": username, "score": score}
+        self.append([record])
+        self.pending[record["submission_id"]] = record
+        return record
+
+    def ready(self, username, now=None):
+        now = time.monotonic() if now is None else now
+        return now >= self.next_attempt and any(record["username"] == username for record in self.pending.values())
+
+    def batch(self, username):
+        records = [record for record in self.pending.values() if record["username"] == username]
+        suspects = [record for record in records if record["submission_id"] in self.suspects]
+        if suspects:
+            # Alone, a refused score only takes itself out of the queue
+            return suspects[:1]
+        return records[:self.batch_size]
+
+    def acknowledge(self, records):
+        self.append([{"ack": record["submission_id"]} for record in records])
+        for record in records:
+            self.pending.pop(record["submission_id"], None)
+            self.suspects.discard(record["submission_id"])
+        self.failures = 0
+        self.next_attempt = 0.0
+        if not self.pending:
+            self.compact()
+
+    def failed(self, now=None, retry_after=None):
+        now = time.monotonic() if now is None else now
+        self.failures += 1
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** self.failures))
+        if retry_after:
+            delay = max(delay, retry_after)
+        self.next_attempt = now + delay
+        return delay
+
+    def rejected(self, records, reason):
+        """Handle scores the server refused; return how many were set aside for good."""
+        if len(records) > 1:
+            self.suspects.update(record["submission_id"] for record in records)
+            return 0
+        self.append([dict(record, reason=reason, rejected_at=time.time()) for record in records],
+                    self.rejected_path)
+        self.acknowledge(records)
+        return len(records)
@@ -0,0 +1,96 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+class ScoreWriter:
+    """Write-behind queue that group-commits score inserts from many requests.
+
+    Request threads call submit() and wait on the returned future; a single
+    writer thread drains the queue and hands up to max_batch rows, or whatever
+    arrived within max_delay seconds, to flush() as one transaction. If that
+    transaction fails, each submission in the batch is flushed again on its
+    own, so only the one at fault gets the error. call() runs other work on
+    the same thread, serialized with the flushes.
+    """
+
+    def __init__(self, flush, max_batch=500, max_delay=0.002):
+        self.flush = flush
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.pending = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="score-writer", daemon=True)
+                self.thread.start()
+
+    def submit(self, rows):
+        self.start()
+        future = Future()
+        self.pending.put((rows, future))
+        return future
+
+    def call(self, task):
+        self.start()
+        future = Future()
+        self.pending.put((task, future))
+        return future
+
+    def next_batch(self, first):
+        batch = [first]
+        count = len(first[0])
+        deadline = time.monotonic() + self.max_delay
+        while count < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self.pending.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if callable(item[0]):
+                # Tasks are barriers: commit what came before them first
+                return batch, item
+            batch.append(item)
+            count += len(item[0])
+        return batch, None
+
+    def run(self):
+        carried = None
+        while True:
+            item = carried or self.pending.get()
+            carried = None
+            if callable(item[0]):
+                task, future = item
+                try:
+                    future.set_result(task())
+                except Exception as e:
+                    future.set_exception(e)
+                continue
+
+            batch, carried = self.next_batch(item)
+            rows = [row for rows, _ in batch for row in rows]
+            try:
+                self.flush(rows)
+            except Exception as e:
+                if len(batch) == 1:
+                    batch[0][1].set_exception(e)
+                else:
+                    self.flush_each(batch)
+            else:
+                for _, future in batch:
+                    future.set_result(None)
+
+    def flush_each(self, batch):
+        # One bad submission shouldn't fail the others grouped with it
+        for rows, future in batch:
+            try:
+                self.flush(rows)
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future.set_result(None)
@@ -2,65 +2,127 @@ import aiohttp
 import asyncio
 import json
 import logging
+from urllib.parse import quote
 
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 class ServerCommunication:
-    def __init__(self, base_url):
+    """Client for the leaderboard API.
+
+    All requests share one ClientSession, created on first use, so repeated
+    calls reuse warm keep-alive connections. Pass connector to share a pool
+    between several clients; it is then left open by close().
+    """
+
+    def __init__(self, base_url, connect_timeout=5, read_timeout=10, pool_size=4, keepalive_timeout=60,
+                 connector=None):
         self.base_url = base_url
         self.access_token = None
+        self.leaderboards = {}  # window -> (etag, data) of the last leaderboard fetched
+        self.timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+        self.pool_size = pool_size
+        self.keepalive_timeout = keepalive_timeout
+        self.connector = connector
+        self.session = None
+
+    def get_session(self):
+        if self.session is None or self.session.closed:
+            if self.connector is not None:
+                connector, owned = self.connector, False
+            else:
+                connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=self.keepalive_timeout,
+                                                 ttl_dns_cache=300)
+                owned = True
+            self.session = aiohttp.ClientSession(connector=connector, connector_owner=owned, timeout=self.timeout)
+        return self.session
+
+    async def close(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
 
     async def register(self, username, password):
         try:
-            logger.debug(f"Attempting to register user: {username}")
-            async with aiohttp.ClientSession() as session:
-                async with session.post(f"{self.base_url}/register", json={"username": username, "password": password}) as response:
-                    logger.debug(f"Registration response status: {response.status}")
-                    if response.status == 201:
-                        data = await response.json()
-                        logger.info(f"Registration successful for user: {username}")
-                        return True, "Registration successful"
-                    else:
-                        error_data = await response.json()
-                        logger.warning(f"Registration failed. Server response: {error_data}")
-                        return False, error_data.get("error", "Registration failed")
+            logger.debug("Attempting to register user: %s", username)
+            session = self.get_session()
+            async with session.post(f"{self.base_url}/register", json={"username": username, "password": password}) as response:
+                logger.debug("Registration response status: %s", response.status)
+                if response.status == 201:
+                    data = await response.json()
+                    logger.info("Registration successful for user: %s", username)
+                    return True, "Registration successful"
+                else:
+                    error_data = await response.json()
+                    logger.warning("Registration failed. Server response: %s", error_data)
+                    return False, error_data.get("error", "Registration failed")
         except Exception as e:
-            logger.error(f"Unexpected error during registration: {str(e)}")
+            logger.error("Unexpected error during registration: %s", e)
             return False, f"Unexpected error: {str(e)}"
 
     async def login(self, username, password):
         try:
-            logger.debug(f"Attempting to login with username: {username}")
-            async with aiohttp.ClientSession() as session:
-                async with session.post(f"{self.base_url}/login", json={"username": username, "password": password}) as response:
-                    logger.debug(f"Login response status: {response.status}")
-                    if response.status == 200:
-                        data = await response.json()
-                        logger.debug(f"Login response data: {data}")
-                        self.access_token = data.get("access_token")
-                        if self.access_token:
-                            logger.info("Login successful")
-                            return True, "Login successful"
-                        else:
-                            logger.warning("Login response didn't contain access token")
-                            return False, "Login response didn't contain access token"
+            logger.debug("Attempting to login with username: %s", username)
+            session = self.get_session()
+            async with session.post(f"{self.base_url}/login", json={"username": username, "password": password}) as response:
+                logger.debug("Login response status: %s", response.status)
+                if response.status == 200:
+                    data = await response.json()
+                    logger.debug("Login response data: %s", data)
+                    self.access_token = data.get("access_token")
+                    if self.access_token:
+                        logger.info("Login successful")
+                        return True, "Login successful"
                     else:
-                        error_data = await response.json()
-                        logger.warning(f"Login failed. Server response: {error_data}")
-                        return False, error_data.get("error", "Login failed")
+                        logger.warning("Login response didn't contain access token")
+                        return False, "Login response didn't contain access token"
+                else:
+                    error_data = await response.json()
+                    logger.warning("Login failed. Server response: %s", error_data)
+                    return False, error_data.get("error", "Login failed")
         except Exception as e:
-            logger.error(f"Unexpected error during login: {str(e)}")
+            logger.error("Unexpected error during login: %s", e)
             return False, f"Unexpected error: {str(e)}"
 
-    async def get_leaderboard(self):
+    async def get_leaderboard(self, window="alltime"):
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(f"{self.base_url}/leaderboard") as response:
-                    if response.status == 200:
-                        return await response.json()
-                    else:
-                        raise Exception(f"Failed to fetch leaderboard: {response.status}")
+            headers = {}
+            etag, cached = self.leaderboards.get(window, (None, None))
+            if etag and cached is not None:
+                headers["If-None-Match"] = etag
+            session = self.get_session()
+            async with session.get(f"{self.base_url}/leaderboard", params={"window": window}, headers=headers) as response:
+                if response.status == 304:
+                    return cached
+                elif response.status == 200:
+                    data = await response.json()
+                    self.leaderboards[window] = (response.headers.get("ETag"), data)
+                    return data
+                else:
+                    raise Exception(f"Failed to fetch leaderboard: {response.status}")
+        except aiohttp.ClientError as e:
+            raise Exception(f"Network error: {str(e)}")
+
+    async def get_rank(self, username, window="alltime"):
+        try:
+            session = self.get_session()
+            async with session.get(f"{self.base_url}/rank/{quote(username, safe='')}", params={"window": window}) as response:
+                if response.status == 200:
+                    return await response.json()
+                elif response.status == 404:
+                    return None
+                else:
+                    raise Exception(f"Failed to fetch rank: {response.status}")
+        except aiohttp.ClientError as e:
+            raise Exception(f"Network error: {str(e)}")
+
+    async def get_percentile(self, score):
+        try:
+            session = self.get_session()
+            async with session.get(f"{self.base_url}/percentile", params={"score": score}) as response:
+                if response.status == 200:
+                    return await response.json()
+                else:
+                    raise Exception(f"Failed to fetch percentile: {response.status}")
         except aiohttp.ClientError as e:
             raise Exception(f"Network error: {str(e)}")
 
@@ -70,14 +132,41 @@ class ServerCommunication:
         
         try:
             headers = {"Authorization": f"Bearer {self.access_token}"}
-            async with aiohttp.ClientSession() as session:
-                async with session.post(f"{self.base_url}/submit_score", json={"score": score}, headers=headers) as response:
-                    if response.status == 200:
-                        return True, "Score submitted successfully"
-                    else:
-                        data = await response.json()
-                        return False, data.get("error", "Failed to submit score")
+            session = self.get_session()
+            async with session.post(f"{self.base_url}/submit_score", json={"score": score}, headers=headers) as response:
+                if response.status == 200:
+                    return True, "Score submitted successfully"
+                else:
+                    data = await response.json()
+                    return False, data.get("error", "Failed to submit score")
         except aiohttp.ClientError as e:
             return False, f"Network error: {str(e)}"
 
+    async def submit_scores(self, scores):
+        """Submit a list of int scores or {"score", "submission_id"} dicts.
+
+        Returns (success, message, status, retry_after); status is None when
+        no response arrived and retry_after is the server's Retry-After in
+        seconds, if it sent one.
+        """
+        if not self.access_token:
+            return False, "Not authenticated", None, None
+
+        try:
+            headers = {"Authorization": f"Bearer {self.access_token}"}
+            session = self.get_session()
+            async with session.post(f"{self.base_url}/submit_scores", json={"scores": scores}, headers=headers) as response:
+                if response.status == 200:
+                    return True, "Scores submitted successfully", response.status, None
+                retry_after = response.headers.get("Retry-After", "")
+                retry_after = int(retry_after) if retry_after.isdigit() else None
+                try:
+                    data = await response.json(content_type=None)
+                    message = data.get("error") or data.get("msg") or "Failed to submit scores"
+                except (ValueError, AttributeError):
+                    message = f"Failed to submit scores: {response.status}"
+                return False, message, response.status, retry_after
+        except aiohttp.ClientError as e:
+            return False, f"Network error: {str(e)}", None, None
+
 server_comm = ServerCommunication("http://localhost:5000/api")
\ No newline at end of file
@@ -0,0 +1,88 @@
+import bisect
+import threading
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+def format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + "}"
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metrics:
+    """Thread-safe counters and histograms rendered in Prometheus text format.
+
+    Recording is a dict lookup and a few additions under an uncontended lock,
+    cheap enough to leave on. Gauges that already live elsewhere (such as
+    cache hit counters) are read at scrape time through collectors.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.descriptions = {}
+        self.counters = {}
+        self.histograms = {}
+        self.collectors = []
+
+    def describe(self, name, metric_type, description):
+        self.descriptions[name] = (metric_type, description)
+
+    def inc(self, name, labels=(), value=1):
+        key = (name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, labels, value, buckets=LATENCY_BUCKETS):
+        key = (name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def add_collector(self, collector):
+        """Register a callable returning (name, labels, value) samples at scrape time."""
+        self.collectors.append(collector)
+
+    def render(self):
+        samples = {}
+        with self.lock:
+            for (name, labels), value in self.counters.items():
+                samples.setdefault(name, []).append(f"{name}{format_labels(labels)} {format_value(value)}")
+            for (name, labels), histogram in self.histograms.items():
+                lines = samples.setdefault(name, [])
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{format_labels(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{name}_sum{format_labels(labels)} {format_value(histogram.sum)}")
+                lines.append(f"{name}_count{format_labels(labels)} {histogram.count}")
+        for collector in self.collectors:
+            for name, labels, value in collector():
+                samples.setdefault(name, []).append(f"{name}{format_labels(labels)} {format_value(value)}")
+
+        output = []
+        for name in sorted(samples):
+            if name in self.descriptions:
+                metric_type, description = self.descriptions[name]
+                output.append(f"# HELP {name} {description}")
+                output.append(f"# TYPE {name} {metric_type}")
+            output.extend(samples[name])
+        return "\n".join(output) + "\n"
@@ -1,9 +1,10 @@
 import pygame
 from game_settings import *
+from retained_menu import RetainedMenu
 
-class SettingsMenu:
+class SettingsMenu(RetainedMenu):
     def __init__(self, screen, sound_manager, font_manager):
-        self.screen = screen
+        super().__init__(screen)
         self.sound_manager = sound_manager
         self.font_manager = font_manager
         self.settings = [
@@ -82,38 +83,41 @@ class SettingsMenu:
         elif setting_name == "SFX Volume":
             self.sound_manager.set_sfx_volume(value)
 
-    def draw(self):
-        self.screen.fill(BLACK)
-        font = self.font_manager.get_font(BASE_FONT_SIZE * 2)
-        title = font.render("Settings", True, WHITE)
+    def view_state(self):
+        return (self.selected_setting, self.is_main_menu_button_selected,
+                tuple(get_value() for _, get_value in self.settings))
+
+    def compose(self, surface):
+        surface.fill(BLACK)
+        title = self.font_manager.render_text("Settings", BASE_FONT_SIZE * 2, WHITE)
         title_rect = title.get_rect(center=(GAME_WIDTH // 2, GAME_HEIGHT // 6))
-        self.screen.blit(title, title_rect)
+        surface.blit(title, title_rect)
 
-        font = self.font_manager.get_font(BASE_FONT_SIZE)
         self.slider_rects = []
         
         for i, (setting_name, get_value) in enumerate(self.settings):
             color = ORANGE if i == self.selected_setting else WHITE
             
             # Draw text
-            text = font.render(setting_name, True, color)
+            text = self.font_manager.render_text(setting_name, BASE_FONT_SIZE, color)
             text_rect = text.get_rect(center=(GAME_WIDTH // 2, GAME_HEIGHT // 2 + i * 100 - 20))
-            self.screen.blit(text, text_rect)
+            surface.blit(text, text_rect)
 
             # Draw slider
             slider_rect = pygame.Rect(GAME_WIDTH // 4, GAME_HEIGHT // 2 + i * 100 + 10, GAME_WIDTH // 2, 10)
-            pygame.draw.rect(self.screen, WHITE, slider_rect, 2)
+            pygame.draw.rect(surface, WHITE, slider_rect, 2)
             filled_width = int(slider_rect.width * get_value())
-            pygame.draw.rect(self.screen, color, (slider_rect.x, slider_rect.y, filled_width, slider_rect.height))
+            pygame.draw.rect(surface, color, (slider_rect.x, slider_rect.y, filled_width, slider_rect.height))
             
             # Draw slider handle
             handle_pos = (slider_rect.x + filled_width, slider_rect.centery)
-            pygame.draw.circle(self.screen, color, handle_pos, 8)
+            pygame.draw.circle(surface, color, handle_pos, 8)
             
             self.slider_rects.append(slider_rect)
 
         # Draw Main Menu button
-        main_menu_text = font.render("Main Menu", True, ORANGE if self.is_main_menu_button_selected else WHITE)
+        button_color = ORANGE if self.is_main_menu_button_selected else WHITE
+        main_menu_text = self.font_manager.render_text("Main Menu", BASE_FONT_SIZE, button_color)
         self.main_menu_button_rect = main_menu_text.get_rect(center=(GAME_WIDTH // 2, GAME_HEIGHT - 50))
-        pygame.draw.rect(self.screen, ORANGE if self.is_main_menu_button_selected else WHITE, self.main_menu_button_rect, 2)
-        self.screen.blit(main_menu_text, self.main_menu_button_rect)
\ No newline at end of file
+        pygame.draw.rect(surface, button_color, self.main_menu_button_rect, 2)
+        surface.blit(main_menu_text, self.main_menu_button_rect)
\ No newline at end of file
@@ -46,4 +46,13 @@ class SoundManager:
 
     def set_sfx_volume(self, volume):
         self.sfx_volume = max(0, min(1, volume))
-        self.update_volumes()
\ No newline at end of file
+        self.update_volumes()
+
+class SilentSoundManager:
+    """Stands in for SoundManager when running without audio."""
+
+    def play_collect(self):
+        pass
+
+    def play_game_over(self):
+        pass
@@ -0,0 +1,66 @@
+import asyncio
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+class TaskScheduler:
+    """Runs network coroutines as background asyncio tasks.
+
+    Completion callbacks are not called from the task itself but queued and
+    run by run_callbacks() from the frame loop, so menus only change state
+    between frames. Submitting with a key cancels any task still pending
+    under that key, so only the latest leaderboard fetch or login counts.
+    """
+
+    def __init__(self):
+        self.running = set()  # Strong references, asyncio only keeps weak ones
+        self.tasks = {}
+        self.completed = deque()
+
+    def submit(self, coroutine, on_done=None, on_error=None, key=None):
+        if key is not None:
+            self.cancel(key)
+        task = asyncio.create_task(coroutine)
+        self.running.add(task)
+        if key is not None:
+            self.tasks[key] = task
+        task.add_done_callback(lambda finished: self.finish(key, finished, on_done, on_error))
+        return task
+
+    def finish(self, key, task, on_done, on_error):
+        self.running.discard(task)
+        if key is not None and self.tasks.get(key) is task:
+            del self.tasks[key]
+        if not task.cancelled():
+            self.completed.append((task, on_done, on_error))
+
+    def pending(self, key):
+        return key in self.tasks
+
+    def cancel(self, key):
+        task = self.tasks.pop(key, None)
+        if task is not None:
+            task.cancel()
+
+    def run_callbacks(self):
+        """Run queued completion callbacks and return how many ran."""
+        ran = len(self.completed)
+        while self.completed:
+            task, on_done, on_error = self.completed.popleft()
+            error = task.exception()
+            if error is not None:
+                if on_error:
+                    on_error(error)
+                else:
+                    logger.error("Background task failed: %s", error)
+            elif on_done:
+                on_done(task.result())
+        return ran
+
+    async def shutdown(self):
+        tasks = list(self.running)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.completed.clear()
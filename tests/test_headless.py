@@ -0,0 +1,49 @@
+import os
+import random
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pytest
+
+from headless import random_toggles, simulate
+from main import GameState, TwisterGame
+
+def script(seed, rate=0.03):
+    return list(random_toggles(seed, rate))
+
+def test_same_seed_and_script_give_the_same_game():
+    first = simulate(121, script(121))
+    assert simulate(121, script(121)) == first
+    assert first['ticks'] > 0
+
+def test_pinned_game():
+    # Any change to movement, spawning or the order of random draws shows up
+    # here. Update the numbers only when gameplay is meant to change.
+    result = simulate(277, script(277))
+    assert (result['score'], result['ticks'], result['game_over']) == (12, 1490, True)
+    assert result['difficulty'] == pytest.approx(1.3471216484081572)
+    assert result['achievements'] == ['Beginner', 'Combo Master']
+
+def test_input_script_changes_the_game():
+    assert simulate(1234, [])['ticks'] != simulate(1234, script(1234, 0.02))['ticks']
+
+def test_global_random_state_does_not_matter():
+    random.seed(1)
+    first = simulate(195, script(195))
+    random.seed(2)
+    random.random()
+    assert simulate(195, script(195)) == first
+
+def test_interleaved_games_do_not_share_state():
+    alone = [simulate(seed, script(seed)) for seed in (121, 195)]
+    games = []
+    for seed in (121, 195):
+        game = TwisterGame(headless=True)
+        game.start_game(seed, script(seed))
+        games.append(game)
+    while any(game.state == GameState.PLAYING for game in games):
+        for game in games:
+            if game.state == GameState.PLAYING:
+                game.update_game()
+    assert [(game.score, game.ticks) for game in games] == [(result['score'], result['ticks']) for result in alone]
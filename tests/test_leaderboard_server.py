@@ -0,0 +1,129 @@
+import os
+
+import pytest
+from sqlalchemy import text
+
+@pytest.fixture(scope="module")
+def server(tmp_path_factory):
+    database = tmp_path_factory.mktemp("db") / "leaderboard.db"
+    os.environ["LEADERBOARD_DATABASE_URI"] = f"sqlite:///{database}"
+    import leaderboard_server
+    assert leaderboard_server.database_path() == str(database)
+    return leaderboard_server
+
+@pytest.fixture
+def client(server):
+    with server.app.app_context():
+        server.db.drop_all()
+    server.init_db()
+    for board in server.boards.values():
+        board.rank_index.clear()
+        board.rank_index.loaded = False
+        board.cache.invalidate()
+    server.histogram.loaded = False
+    return server.app.test_client()
+
+def add_players(server, best_scores):
+    """Insert users and best scores directly, as a database written by an older version would hold them."""
+    with server.app.app_context():
+        for user_id, (name, score) in enumerate(best_scores, 1):
+            server.db.session.execute(text("INSERT INTO user (id, username, password_hash) VALUES (:id, :name, 'x')"),
+                                      {"id": user_id, "name": name})
+            server.db.session.execute(text("INSERT INTO best_score (user_id, score) VALUES (:id, :score)"),
+                                      {"id": user_id, "score": score})
+        server.db.session.commit()
+
+def auth_header(server, user_id):
+    from flask_jwt_extended import create_access_token
+    with server.app.app_context():
+        return {"Authorization": "Bearer " + create_access_token(identity=user_id)}
+
+def test_scores_stored_before_the_cap_still_rank(server, client):
+    huge = server.app.config["MAX_SCORE"] * 1000
+    add_players(server, [("a", 40), ("b", huge), ("c", huge + 1), ("d", 40)])
+
+    board = client.get("/api/leaderboard").get_json()
+    assert [(entry["name"], entry["rank"]) for entry in board] == [("c", 1), ("b", 1), ("a", 3), ("d", 3)]
+    page = client.get("/api/leaderboard?offset=1&limit=2").get_json()
+    assert [entry["name"] for entry in page] == ["b", "a"]
+
+    rank = client.get("/api/rank/b?radius=1").get_json()
+    assert (rank["rank"], rank["offset"], rank["players"]) == (1, 0, 4)
+    assert [entry["name"] for entry in rank["neighbours"]] == ["c", "b", "a"]
+
+    # A new submission from a player whose stored best is above the cap
+    response = client.post("/api/submit_score", json={"score": 5}, headers=auth_header(server, 3))
+    assert response.status_code == 200
+    assert client.get("/api/rank/d").get_json()["rank"] == 3
+
+@pytest.mark.parametrize("score", [-1, -2 ** 70, 10 ** 12, True, "7", 1.5])
+def test_out_of_range_scores_are_rejected(server, client, score):
+    add_players(server, [("a", 1)])
+    headers = auth_header(server, 1)
+    assert client.post("/api/submit_score", json={"score": score}, headers=headers).status_code == 400
+    assert client.post("/api/submit_score", json=score, headers=headers).status_code == 400
+    assert client.post("/api/submit_scores", json={"scores": [3, score]}, headers=headers).status_code == 400
+
+def test_scores_at_both_limits_are_accepted(server, client):
+    add_players(server, [("a", 1)])
+    headers = auth_header(server, 1)
+    assert client.post("/api/submit_score", json={"score": 0}, headers=headers).status_code == 200
+    assert client.post("/api/submit_score", json=server.app.config["MAX_SCORE"], headers=headers).status_code == 200
+    assert client.get("/api/rank/a").get_json()["score"] == server.app.config["MAX_SCORE"]
+
+@pytest.mark.parametrize("name", ["d/e", "a/b/c", "x%2Fy", "we ird?#"])
+def test_rank_lookup_for_any_registered_name(server, client, name):
+    from urllib.parse import quote
+    add_players(server, [(name, 12)])
+    response = client.get(f"/api/rank/{quote(name, safe='')}")
+    assert response.status_code == 200
+    assert response.get_json()["name"] == name
+
+def expected_board(best_scores):
+    """(name, score, rank) in leaderboard order: score descending, then user id."""
+    ordered = sorted(enumerate(best_scores, 1), key=lambda item: (-item[1][1], item[0]))
+    return [(name, score, 1 + sum(other > score for _, other in best_scores)) for _, (name, score) in ordered]
+
+def as_tuples(entries):
+    return [(entry["name"], entry["score"], entry["rank"]) for entry in entries]
+
+CLUSTERED = [(f"p{i}", [0, 3, 3, 3, 5, 9, 9][i % 7]) for i in range(40)]
+
+def test_pages_at_every_offset_match_a_full_sort(server, client):
+    add_players(server, CLUSTERED)
+    expected = expected_board(CLUSTERED)
+    for limit in (1, 3, 10):
+        for offset in range(len(expected) + 1):
+            page = client.get(f"/api/leaderboard?offset={offset}&limit={limit}").get_json()
+            assert as_tuples(page) == expected[offset:offset + limit]
+
+def test_paging_after_a_player_walks_the_whole_board(server, client):
+    add_players(server, CLUSTERED)
+    seen = as_tuples(client.get("/api/leaderboard?offset=0&limit=6").get_json())
+    while True:
+        page = as_tuples(client.get(f"/api/leaderboard?after={seen[-1][0]}&limit=6").get_json())
+        if not page:
+            break
+        seen += page
+    assert seen == expected_board(CLUSTERED)
+    assert client.get("/api/leaderboard?after=nobody&limit=6").status_code == 404
+
+def test_rank_neighbours_inside_ties(server, client):
+    add_players(server, CLUSTERED)
+    expected = expected_board(CLUSTERED)
+    for position, (name, score, rank) in enumerate(expected):
+        response = client.get(f"/api/rank/{name}?radius=4").get_json()
+        start = max(0, position - 4)
+        assert (response["score"], response["rank"], response["offset"]) == (score, rank, start)
+        assert as_tuples(response["neighbours"]) == expected[start:position + 5]
+
+def test_windowed_board_ties(server, client):
+    add_players(server, [(f"w{i}", 0) for i in range(6)])
+    for user_id, score in [(1, 4), (2, 7), (3, 4), (4, 4), (5, 1), (6, 4)]:
+        response = client.post("/api/submit_score", json={"score": score}, headers=auth_header(server, user_id))
+        assert response.status_code == 200
+    expected = expected_board([("w0", 4), ("w1", 7), ("w2", 4), ("w3", 4), ("w4", 1), ("w5", 4)])
+    assert as_tuples(client.get("/api/leaderboard?window=daily&offset=2&limit=3").get_json()) == expected[2:5]
+    response = client.get("/api/rank/w3?window=daily&radius=1").get_json()
+    assert (response["rank"], response["offset"]) == (2, 2)
+    assert as_tuples(response["neighbours"]) == expected[2:5]
@@ -0,0 +1,104 @@
+import sqlite3
+
+import pytest
+
+from online_migrate import AddColumn, Backfill, BuildIndexes, connect, migration_status, run_migrations
+
+ROWS = 1000
+INDEX = {"ix_score_user_score": "CREATE INDEX ix_score_user_score ON {table} (user_id, score)"}
+
+class Crash(Exception):
+    pass
+
+class CrashAfter:
+    """Wraps a migration so the process 'dies' partway through its batch number n."""
+
+    def __init__(self, migration, n):
+        self.migration = migration
+        self.name = migration.name
+        self.batches = 0
+        self.n = n
+
+    def run(self, conn, position, target, batch_size):
+        self.batches += 1
+        result = self.migration.run(conn, position, target, batch_size)
+        if self.batches == self.n:
+            raise Crash()
+        return result
+
+    def describe(self, position, target):
+        return self.migration.describe(position, target)
+
+@pytest.fixture
+def database(tmp_path):
+    path = str(tmp_path / "leaderboard.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE score (id INTEGER NOT NULL, user_id INTEGER NOT NULL, score INTEGER NOT NULL, "
+                 "PRIMARY KEY (id))")
+    conn.executemany("INSERT INTO score (id, user_id, score) VALUES (?, ?, ?)",
+                     [(i, i % 37, i * 7 % 101) for i in range(1, ROWS + 1)])
+    conn.execute("CREATE TABLE visited (id INTEGER NOT NULL)")
+    conn.commit()
+    conn.close()
+    return path
+
+def rows(path, sql):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+def migrate(path, migrations):
+    run_migrations(path, migrations, batch_size=100, pause=0)
+
+def test_backfill_resumes_after_a_crash_without_repeating_batches(database):
+    # Not idempotent on purpose: a repeated batch would visit ids twice
+    backfill = Backfill("visit", "score", "INSERT INTO visited SELECT id FROM score WHERE id > :start AND id <= :end")
+    with pytest.raises(Crash):
+        migrate(database, [CrashAfter(backfill, 5)])
+    assert rows(database, "SELECT COUNT(*) FROM visited") == [(300,)]
+    assert dict(migration_status(database, [backfill]))["visit"] == "in progress, id 300 of 1000"
+
+    migrate(database, [backfill])
+    assert rows(database, "SELECT COUNT(*), COUNT(DISTINCT id), MIN(id), MAX(id) FROM visited") == [(ROWS, ROWS, 1, ROWS)]
+    assert dict(migration_status(database, [backfill]))["visit"] == "done"
+
+    migrate(database, [backfill])
+    assert rows(database, "SELECT COUNT(*) FROM visited") == [(ROWS,)]
+
+def test_index_build_resumes_and_keeps_writes_made_meanwhile(database):
+    build = BuildIndexes("score_index", "score", INDEX)
+    with pytest.raises(Crash):
+        migrate(database, [CrashAfter(build, 4)])
+    assert rows(database, "SELECT name FROM sqlite_master WHERE name = 'score__shadow'") == [("score__shadow",)]
+
+    # The game keeps writing while the migration is stopped
+    conn = sqlite3.connect(database)
+    conn.execute("INSERT INTO score (id, user_id, score) VALUES (?, ?, ?)", (ROWS + 1, 5, 55))
+    conn.execute("UPDATE score SET score = -1 WHERE id IN (10, 900)")
+    conn.execute("DELETE FROM score WHERE id IN (20, 950)")
+    conn.commit()
+    conn.close()
+    expected = rows(database, "SELECT * FROM score ORDER BY id")
+
+    migrate(database, [build])
+    assert rows(database, "SELECT * FROM score ORDER BY id") == expected
+    assert rows(database, "SELECT name FROM sqlite_master WHERE type IN ('index', 'trigger', 'table') "
+                          "AND name LIKE 'score%' ORDER BY name") == [("score",)]
+    assert rows(database, "SELECT name FROM sqlite_master WHERE name = 'ix_score_user_score'") == [("ix_score_user_score",)]
+    plan = rows(database, "EXPLAIN QUERY PLAN SELECT score FROM score WHERE user_id = 5")
+    assert "ix_score_user_score" in plan[0][3]
+
+def test_finished_steps_are_skipped(database):
+    steps = [AddColumn("score_created_at", "score", "created_at", "DATETIME"),
+             BuildIndexes("score_index", "score", INDEX)]
+    migrate(database, steps)
+    assert dict(migration_status(database, steps)) == {"score_created_at": "done", "score_index": "done"}
+    conn = connect(database)
+    try:
+        assert "created_at" in [row[1] for row in conn.execute("PRAGMA table_info(score)")]
+    finally:
+        conn.close()
+    # Would crash on its first batch if it ran again
+    migrate(database, [CrashAfter(step, 1) for step in steps])
@@ -0,0 +1,58 @@
+from rank_index import RankIndex
+
+def build(scores, **kwargs):
+    index = RankIndex(**kwargs)
+    for score in scores:
+        index.add(score)
+    return index
+
+def descending(index):
+    return [index.score_at(position) for position in range(index.total)]
+
+def test_ties_share_a_rank():
+    index = build([50, 30, 30, 30, 10])
+    assert [index.rank(score) for score in (50, 30, 10)] == [1, 2, 5]
+    assert index.count_above(30) == 1
+    assert index.rank(40) == 2
+    assert index.rank(100) == 1
+
+def test_score_at_walks_positions_in_descending_order():
+    scores = [7, 3, 3, 12, 0, 3, 99]
+    index = build(scores)
+    assert descending(index) == sorted(scores, reverse=True)
+    assert index.score_at(-1) is None
+    assert index.score_at(len(scores)) is None
+
+def test_offsets_inside_a_run_of_ties():
+    index = build([20] + [5] * 6 + [1])
+    for position in range(1, 7):
+        assert index.score_at(position) == 5
+        assert position - index.count_above(5) == position - 1
+
+def test_grows_past_initial_capacity():
+    index = build([3, 5000, 70000], capacity=8)
+    assert index.size >= 70001
+    assert descending(index) == [70000, 5000, 3]
+    assert index.rank(5000) == 2
+
+def test_move_replaces_old_best():
+    index = build([10, 20])
+    index.move(10, 30)
+    index.move(None, 15)
+    assert descending(index) == [30, 20, 15]
+    assert index.total == 3
+
+def test_scores_beyond_the_ends_are_clamped():
+    index = build([-5, 0, 50, 10 ** 12], capacity=8, max_score=100)
+    assert index.size <= 128
+    assert descending(index) == [100, 50, 0, 0]
+    assert index.rank(10 ** 12) == 1
+    assert index.rank(100) == 1
+    assert index.rank(-5) == index.rank(0) == 3
+
+def test_load_replaces_contents():
+    index = build([1, 2, 3], max_score=100)
+    index.load([(40, 2), (10 ** 9, 1)])
+    assert index.loaded
+    assert index.total == 3
+    assert descending(index) == [100, 40, 40]
@@ -0,0 +1,70 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pytest
+
+from headless import random_toggles
+from main import GameState, TwisterGame
+from replay import MAGIC, VERSION, Replay, ReplayError, read_varint, save_replay, verify, write_varint
+
+@pytest.mark.parametrize("value, encoded", [
+    (0, b"\x00"), (127, b"\x7f"), (128, b"\x80\x01"), (300, b"\xac\x02"),
+    (16383, b"\xff\x7f"), (16384, b"\x80\x80\x01"), (2 ** 32 - 1, b"\xff\xff\xff\xff\x0f"),
+])
+def test_varint_encoding(value, encoded):
+    out = bytearray()
+    write_varint(out, value)
+    assert bytes(out) == encoded
+    assert read_varint(encoded + b"\xff", 0) == (value, len(encoded))
+
+def test_varint_rejects_negative_values():
+    with pytest.raises(ReplayError):
+        write_varint(bytearray(), -1)
+
+def test_file_layout():
+    data = Replay(seed=300, toggles=[5, 133, 133], ticks=200, score=3).to_bytes()
+    # seed, final tick, score, toggle count, then deltas 5, 128, 0
+    assert data == MAGIC + bytes([VERSION]) + b"\xac\x02\xc8\x01\x03\x03\x05\x80\x01\x00"
+
+def test_round_trip_through_a_file(tmp_path):
+    replay = Replay(seed=2 ** 32 - 1, toggles=[0, 1, 1000, 70000], ticks=70001, score=99)
+    path = save_replay(replay, directory=str(tmp_path))
+    loaded = Replay.load(path)
+    assert (loaded.seed, loaded.toggles, loaded.ticks, loaded.score) == (2 ** 32 - 1, [0, 1, 1000, 70000], 70001, 99)
+    assert os.path.basename(path).endswith("-99-ffffffff.twr")
+
+def test_damaged_files_are_rejected():
+    data = Replay(seed=7, toggles=[3, 9], ticks=20, score=1).to_bytes()
+    for length in range(len(data)):
+        with pytest.raises(ReplayError):
+            Replay.from_bytes(data[:length])
+    with pytest.raises(ReplayError):
+        Replay.from_bytes(b"PNG!" + data[4:])
+    with pytest.raises(ReplayError):
+        Replay.from_bytes(MAGIC + bytes([VERSION + 1]) + data[5:])
+
+def play(seed, toggle_ticks):
+    """Play a game headlessly, pressing space before the given ticks like a player would."""
+    toggle_ticks = set(toggle_ticks)
+    game = TwisterGame(headless=True)
+    game.start_game(seed)
+    while game.state == GameState.PLAYING:
+        if game.ticks in toggle_ticks:
+            game.toggle_direction()
+        game.update_game()
+    return game
+
+def test_recorded_game_verifies():
+    game = play(277, random_toggles(277, 0.03))
+    assert game.score > 0
+    replay = Replay.from_bytes(game.replay().to_bytes())
+    ok, result = verify(replay)
+    assert ok
+    assert (result['score'], result['ticks']) == (game.score, game.ticks)
+
+def test_tampered_score_fails_verification():
+    replay = play(121, random_toggles(121, 0.03)).replay()
+    replay.score += 1
+    assert not verify(replay)[0]
@@ -0,0 +1,35 @@
+import pytest
+
+from score_histogram import ScoreHistogram
+
+def loaded(scores, width=10):
+    histogram = ScoreHistogram(width)
+    histogram.load(histogram.deltas([(None, score) for score in scores]).items())
+    return histogram
+
+def test_percentile_interpolates_inside_a_bucket():
+    histogram = loaded([5, 15, 15, 25])
+    assert histogram.percentile(0) == 0
+    assert histogram.percentile(10) == pytest.approx(25)
+    assert histogram.percentile(15) == pytest.approx(50)
+    assert histogram.percentile(30) == pytest.approx(100)
+
+def test_negative_scores_count_in_the_first_bucket():
+    histogram = loaded([-4, 3])
+    assert histogram.buckets() == [{'min': 0, 'max': 9, 'count': 2}]
+    assert histogram.percentile(-100) == 0
+
+def test_best_score_changes_move_players_between_buckets():
+    histogram = loaded([5, 15])
+    histogram.apply(histogram.deltas([(5, 8), (15, 31), (None, 2)]))
+    assert histogram.total == 3
+    assert [(bucket['min'], bucket['count']) for bucket in histogram.buckets()] == [(0, 2), (30, 1)]
+
+def test_raising_a_score_within_its_bucket_changes_nothing():
+    histogram = ScoreHistogram(10)
+    assert histogram.deltas([(11, 19)]) == {}
+
+def test_empty_histogram():
+    histogram = loaded([])
+    assert histogram.percentile(50) == 0.0
+    assert histogram.buckets() == []
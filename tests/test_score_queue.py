@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+from score_queue import ScoreQueue, is_permanent
+
+@pytest.fixture
+def paths(tmp_path):
+    return str(tmp_path / "pending.jsonl"), str(tmp_path / "rejected.jsonl")
+
+def make_queue(paths, **kwargs):
+    path, rejected_path = paths
+    return ScoreQueue(path, rejected_path=rejected_path, **kwargs)
+
+def test_unacknowledged_scores_survive_a_restart(paths):
+    queue = make_queue(paths)
+    first, second, third = (queue.add("ann", score) for score in (1, 2, 3))
+    queue.acknowledge([first])
+    with open(paths[0], "a", encoding="utf-8") as f:
+        f.write('{"submission_id": "torn')  # Crash halfway through a write
+    reloaded = make_queue(paths)
+    assert list(reloaded.pending) == [second["submission_id"], third["submission_id"]]
+
+def test_acknowledging_everything_compacts_the_file(paths):
+    queue = make_queue(paths)
+    queue.acknowledge([queue.add("ann", 1), queue.add("ann", 2)])
+    assert open(paths[0], encoding="utf-8").read() == ""
+
+def test_batches_are_per_user_and_bounded(paths):
+    queue = make_queue(paths, batch_size=2)
+    for score in range(3):
+        queue.add("ann", score)
+    queue.add("bob", 9)
+    assert [record["score"] for record in queue.batch("ann")] == [0, 1]
+    assert [record["score"] for record in queue.batch("bob")] == [9]
+    assert not queue.ready("cid")
+
+def test_failures_back_off_with_retry_after_as_the_floor(paths):
+    queue = make_queue(paths, base_delay=1.0, max_delay=4.0)
+    queue.add("ann", 1)
+    for _ in range(5):
+        assert 0 <= queue.failed(now=100.0) <= 4.0
+    assert queue.failed(now=100.0, retry_after=30) == 30
+    assert not queue.ready("ann", now=129.0)
+    assert queue.ready("ann", now=130.0)
+    queue.acknowledge(queue.batch("ann"))
+    assert queue.failures == 0
+
+def test_refused_batch_is_narrowed_to_the_bad_score(paths):
+    queue = make_queue(paths)
+    records = [queue.add("ann", score) for score in (1, -1, 2)]
+    assert queue.rejected(records, "Expected a list of integer scores") == 0
+    assert queue.ready("ann")
+    assert queue.batch("ann") == records[:1]
+    queue.acknowledge(records[:1])
+    assert queue.batch("ann") == records[1:2]
+    assert queue.rejected(records[1:2], "Expected a list of integer scores") == 1
+    assert queue.batch("ann") == records[2:]
+    rejected = [json.loads(line) for line in open(paths[1], encoding="utf-8")]
+    assert [(record["score"], record["reason"]) for record in rejected] == [(-1, "Expected a list of integer scores")]
+    assert list(make_queue(paths).pending) == [records[2]["submission_id"]]
+
+@pytest.mark.parametrize("status, permanent", [
+    (None, False), (500, False), (503, False), (408, False), (429, False),
+    (401, False), (422, False), (400, True), (404, True), (413, True),
+])
+def test_only_final_client_errors_are_permanent(status, permanent):
+    assert is_permanent(status) == permanent
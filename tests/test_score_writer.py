@@ -0,0 +1,61 @@
+import threading
+
+import pytest
+
+from score_writer import ScoreWriter
+
+class Flushes:
+    """Flush function that records each call and fails any containing a negative row."""
+
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+
+    def __call__(self, rows):
+        self.release.wait(5)
+        self.calls.append(list(rows))
+        if any(row < 0 for row in rows):
+            raise ValueError(f"bad rows {rows}")
+
+def submit_while_held(writer, flushes, batches):
+    # The first flush blocks until every submission is queued, so the rest
+    # land in one group commit
+    futures = [writer.submit(rows) for rows in batches]
+    flushes.release.set()
+    return futures
+
+def test_queued_submissions_share_a_commit():
+    flushes = Flushes()
+    writer = ScoreWriter(flushes, max_batch=100, max_delay=0.05)
+    futures = submit_while_held(writer, flushes, [[1], [2, 3], [4], [5]])
+    assert [future.result(5) for future in futures] == [None] * 4
+    assert sorted(row for call in flushes.calls for row in call) == [1, 2, 3, 4, 5]
+    assert len(flushes.calls) <= 2
+
+def test_max_batch_splits_commits():
+    flushes = Flushes()
+    writer = ScoreWriter(flushes, max_batch=3, max_delay=0.05)
+    futures = submit_while_held(writer, flushes, [[i] for i in range(7)])
+    for future in futures:
+        future.result(5)
+    assert all(len(call) <= 3 for call in flushes.calls)
+    assert sorted(row for call in flushes.calls for row in call) == list(range(7))
+
+def test_a_bad_submission_only_fails_itself():
+    flushes = Flushes()
+    writer = ScoreWriter(flushes, max_batch=100, max_delay=0.05)
+    good, bad, other = submit_while_held(writer, flushes, [[1], [2, -3], [4]])
+    assert good.result(5) is None
+    assert other.result(5) is None
+    with pytest.raises(ValueError):
+        bad.result(5)
+    assert [1] in flushes.calls and [4] in flushes.calls
+
+def test_calls_run_after_earlier_submissions():
+    flushes = Flushes()
+    writer = ScoreWriter(flushes, max_batch=100, max_delay=0.05)
+    submitted = writer.submit([1])
+    seen = writer.call(lambda: [row for call in flushes.calls for row in call])
+    flushes.release.set()
+    assert submitted.result(5) is None
+    assert seen.result(5) == [1]